@@ -9,21 +9,37 @@
 # ]
 # ///
 
-from slap import read_logs
+import heapq
+from slap import read_logs, parse_histogram, histogram_percentile
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
-from collections import Counter
+from collections import Counter, defaultdict
 
 console = Console()
 
+def format_bytes(bytes_val):
+    """Convert bytes to human-readable format"""
+    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+        if bytes_val < 1024.0:
+            return f"{bytes_val:.2f} {unit}"
+        bytes_val /= 1024.0
+    return f"{bytes_val:.2f} PB"
+
 # Read all logs (from stdin or files)
-log_snapshot = read_logs()
+log_snapshot = read_logs(compact=True)
 
 # Extract data from logs
 discovered_files = log_snapshot.get('File Discovered', [])
 stat_entries = log_snapshot.get('File Stat Collected', [])
-hash_entries = log_snapshot.get('File Hash Collected', [])
+# Files can carry several digests - duplicates are judged on BLAKE2b alone
+hash_entries = [
+    entry for entry in log_snapshot.get('File Hash Collected', [])
+    if entry.get('algorithm', 'blake2b') == 'blake2b'
+]
+stage_runs = log_snapshot.get('Stage Completed', [])
+chunk_entries = log_snapshot.get('File Chunk Collected', [])
+chunked_files = log_snapshot.get('File Chunked', [])
 
 console.print("\n[bold cyan]═══ File System Analysis ═══[/bold cyan]\n")
 
@@ -46,14 +62,6 @@ if stat_entries:
         max_size = max(sizes)
         avg_size = total_size / len(sizes)
 
-        def format_bytes(bytes_val):
-            """Convert bytes to human-readable format"""
-            for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-                if bytes_val < 1024.0:
-                    return f"{bytes_val:.2f} {unit}"
-                bytes_val /= 1024.0
-            return f"{bytes_val:.2f} PB"
-
         console.print(Panel(
             f"[yellow]Total Size:[/yellow] {format_bytes(total_size)}\n"
             f"[yellow]Min Size:[/yellow] {format_bytes(min_size)}\n"
@@ -85,10 +93,14 @@ if stat_entries:
             console.print(f"[dim]... and {len(ext_counter) - 15} more extension types[/dim]\n")
 
 if hash_entries:
-    # Duplicate detection
-    hashes = [entry['hash'] for entry in hash_entries if 'hash' in entry]
-    hash_counter = Counter(hashes)
-    duplicates = {h: count for h, count in hash_counter.items() if count > 1}
+    # Duplicate detection - group hashed files by hash once, so every lookup
+    # below is a dict access instead of another scan over hash_entries
+    entries_by_hash = defaultdict(list)
+    for entry in hash_entries:
+        if 'hash' in entry:
+            entries_by_hash[entry['hash']].append(entry['entry'])
+
+    duplicates = {h: len(entries) for h, entries in entries_by_hash.items() if len(entries) > 1}
 
     if duplicates:
         total_duplicate_files = sum(count for count in duplicates.values())
@@ -97,12 +109,12 @@ if hash_entries:
 
         # Calculate wasted space
         if stat_entries:
-            hash_to_size = {}
-            for stat_entry in stat_entries:
-                for hash_entry in hash_entries:
-                    if stat_entry['entry'] == hash_entry['entry']:
-                        hash_to_size[hash_entry['hash']] = int(stat_entry.get('size_bytes', 0))
-                        break
+            # Join hashes to sizes through an index on entry
+            size_by_entry = {entry['entry']: int(entry.get('size_bytes', 0)) for entry in stat_entries}
+            hash_to_size = {
+                h: next((size_by_entry[e] for e in entries_by_hash[h] if e in size_by_entry), 0)
+                for h in duplicates
+            }
 
             wasted_space = sum(
                 hash_to_size.get(h, 0) * (count - 1)
@@ -127,16 +139,13 @@ if hash_entries:
                 table.add_column("Total Wasted", justify="right", style="magenta")
                 table.add_column("Example File", style="cyan", no_wrap=False)
 
-                sorted_dupes = sorted(duplicates.items(), key=lambda x: x[1], reverse=True)[:10]
+                sorted_dupes = heapq.nlargest(10, duplicates.items(), key=lambda x: x[1])
                 for hash_val, count in sorted_dupes:
                     size = hash_to_size.get(hash_val, 0)
                     wasted = size * (count - 1)
 
-                    # Find one of the files with this hash
-                    example_file = next(
-                        (entry['entry'] for entry in hash_entries if entry.get('hash') == hash_val),
-                        "N/A"
-                    )
+                    # One of the files with this hash
+                    example_file = entries_by_hash[hash_val][0]
 
                     table.add_row(
                         hash_val[:16],
@@ -154,4 +163,91 @@ if hash_entries:
             border_style="green"
         ))
 
+if chunk_entries:
+    # One chunk per (file, offset), then count each distinct chunk's bytes once
+    chunk_at = {
+        (chunk['entry'], int(chunk['offset'])): (chunk['hash'], int(chunk['length']))
+        for chunk in chunk_entries
+    }
+    length_by_chunk = {}
+    files_by_chunk = defaultdict(set)
+    for (entry, _), (chunk_hash, length) in chunk_at.items():
+        length_by_chunk[chunk_hash] = length
+        files_by_chunk[chunk_hash].add(entry)
+
+    total_chunk_bytes = sum(length for _, length in chunk_at.values())
+    unique_chunk_bytes = sum(length_by_chunk.values())
+    duplicate_chunk_bytes = total_chunk_bytes - unique_chunk_bytes
+    files_sharing = len({entry for files in files_by_chunk.values() if len(files) > 1 for entry in files})
+
+    # Files with the same manifest are whole-file copies - the rest of the
+    # savings are what only chunking finds (edits, re-exports, appends)
+    files_by_manifest = defaultdict(list)
+    for chunked in chunked_files:
+        files_by_manifest[chunked['manifest']].append(int(chunked['size_bytes']))
+    whole_file_bytes = sum(sizes[0] * (len(sizes) - 1) for sizes in files_by_manifest.values())
+    partial_bytes = max(0, duplicate_chunk_bytes - whole_file_bytes)
+
+    share = duplicate_chunk_bytes / total_chunk_bytes * 100 if total_chunk_bytes else 0
+    console.print(Panel(
+        f"[blue]Files Chunked:[/blue] {len({entry for entry, _ in chunk_at})}\n"
+        f"[blue]Chunks:[/blue] {len(chunk_at)} ({len(length_by_chunk)} unique)\n"
+        f"[blue]Total Bytes:[/blue] {format_bytes(total_chunk_bytes)}\n"
+        f"[blue]Unique Bytes:[/blue] {format_bytes(unique_chunk_bytes)}\n"
+        f"[blue]Duplicate Bytes:[/blue] {format_bytes(duplicate_chunk_bytes)} ({share:.1f}%)\n"
+        f"[blue]  in whole-file copies:[/blue] {format_bytes(whole_file_bytes)}\n"
+        f"[blue]  shared between different files:[/blue] {format_bytes(partial_bytes)}\n"
+        f"[blue]Files Sharing Chunks:[/blue] {files_sharing}",
+        title="[bold]Chunk-Level Duplicate Analysis[/bold]",
+        border_style="blue"
+    ))
+
+if stage_runs:
+    # Per-stage throughput over every logged run
+    runs_by_stage = defaultdict(list)
+    for run in stage_runs:
+        runs_by_stage[run['stage']].append(run)
+
+    table = Table(title="[bold]Stage Performance[/bold]", show_header=True, header_style="bold blue")
+    table.add_column("Stage", style="cyan")
+    table.add_column("Runs", justify="right")
+    table.add_column("Items", justify="right", style="green")
+    table.add_column("Wall / CPU", justify="right")
+    table.add_column("Items/s", justify="right", style="green")
+    table.add_column("MB/s", justify="right", style="yellow")
+    table.add_column("p50 / p95 / p99 ms", justify="right", style="magenta")
+    table.add_column("Peak RSS", justify="right", style="dim")
+
+    for stage, runs in sorted(runs_by_stage.items()):
+        seconds = sum(float(run['duration_ms']) for run in runs) / 1000
+        cpu_seconds = sum(float(run['cpu_ms']) for run in runs) / 1000
+        items = sum(int(run['items']) for run in runs)
+        total_bytes = sum(int(run['bytes']) for run in runs)
+        peak_rss = max((float(run['peak_rss_mb']) for run in runs if 'peak_rss_mb' in run), default=None)
+
+        # Percentiles don't average - merge each run's latency histogram
+        # and read them off the whole thing instead
+        merged = defaultdict(int)
+        for run in runs:
+            if run.get('latency_histogram'):
+                for bucket, count in parse_histogram(run['latency_histogram']).items():
+                    merged[bucket] += count
+        if merged:
+            latency = " / ".join(f"{histogram_percentile(merged, pct):.2f}" for pct in (50, 95, 99))
+        else:
+            latency = "-"
+
+        table.add_row(
+            stage,
+            str(len(runs)),
+            str(items),
+            f"{seconds:.2f}s / {cpu_seconds:.2f}s",
+            f"{items / seconds:,.0f}" if seconds else "-",
+            f"{total_bytes / 2**20 / seconds:,.1f}" if seconds and total_bytes else "-",
+            latency,
+            f"{peak_rss:.0f} MB" if peak_rss is not None else "-",
+        )
+
+    console.print(table)
+
 console.print()
@@ -0,0 +1,86 @@
+#!/usr/bin/env -S uv run --script
+
+# /// script
+# requires-python = ">=3.14"
+# dependencies = []
+# ///
+
+# Micro-benchmark of the hashing paths in hashing.py across file sizes, used
+# to pick DEFAULT_CHUNK_SIZE. Files are read once before timing so this
+# measures CPU and allocation overhead out of the page cache, not the disk.
+#
+#   ./bench_hashing.py                 # 4 KiB .. 256 MiB
+#   ./bench_hashing.py 1048576 ...     # specific file sizes in bytes
+
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from hashing import hash_file, hash_file_multi
+
+SIZES = [4 << 10, 256 << 10, 4 << 20, 64 << 20, 256 << 20]
+CHUNK_SIZES = [8 << 10, 64 << 10, 256 << 10, 1 << 20, 4 << 20]
+
+# Digests for the one-read-versus-one-read-each comparison. Out of the page
+# cache only the CPU side shows - on disk the separate reads cost 3x the I/O.
+MULTI_ALGORITHMS = ("blake2b", "sha256", "crc32")
+
+def old_hash_file(file_path):
+    """The original hash_items.py loop - a new bytes object every 8 KiB"""
+    hasher = hashlib.blake2b()
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(8192):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def mb_per_sec(fn, file_path, size, min_seconds=0.5):
+    """Run fn repeatedly for at least min_seconds and return the best MB/s"""
+    best = float('inf')
+    deadline = time.perf_counter() + min_seconds
+    runs = 0
+    while runs < 3 or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        fn(file_path)
+        best = min(best, time.perf_counter() - start)
+        runs += 1
+    return size / best / (1 << 20)
+
+def format_size(size):
+    for unit in ['B', 'KiB', 'MiB', 'GiB']:
+        if size < 1024:
+            return f"{size}{unit}"
+        size //= 1024
+    return f"{size}TiB"
+
+sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+
+paths = {
+    "read(8192)": old_hash_file,
+    **{
+        f"readinto {format_size(c)}": (lambda p, c=c: hash_file(p, chunk_size=c))
+        for c in CHUNK_SIZES
+    },
+    **{
+        f"mmap {format_size(c)}": (lambda p, c=c: hash_file(p, chunk_size=c, use_mmap=True))
+        for c in CHUNK_SIZES
+    },
+    "3 digests, 3 reads": lambda p: [hash_file_multi(p, (a,)) for a in MULTI_ALGORITHMS],
+    "3 digests, 1 read": lambda p: hash_file_multi(p, MULTI_ALGORITHMS),
+}
+
+with tempfile.TemporaryDirectory() as tmp:
+    header = f"{'path':<18}" + "".join(f"{format_size(s):>12}" for s in sizes)
+    print(f"MB/s by file size\n{header}")
+
+    files = {}
+    for size in sizes:
+        file_path = os.path.join(tmp, f"{size}.bin")
+        with open(file_path, 'wb') as f:
+            f.write(os.urandom(size))
+        old_hash_file(file_path)  # warm the page cache
+        files[size] = file_path
+
+    for name, fn in paths.items():
+        row = "".join(f"{mb_per_sec(fn, files[s], s):>12,.0f}" for s in sizes)
+        print(f"{name:<18}{row}")
@@ -0,0 +1,91 @@
+#!/usr/bin/env -S uv run --script
+
+# /// script
+# requires-python = ">=3.14"
+# dependencies = [
+#     "logfmter",
+#     "logfmt",
+#     "rich",
+# ]
+# ///
+
+# Compare lines/sec of slap's logfmt parser against the old per-line logfmt.parse path.
+#
+#   ./bench_logfmt.py            # benchmark against logs/*.log
+#   ./bench_logfmt.py some.log   # benchmark against specific files
+
+import logging
+import sys
+import time
+from pathlib import Path
+from logfmt import parse
+from logfmter import Logfmter
+from slap import parse_logfmt, parse_logfmt_buffer
+
+# Values Logfmter writes unquoted even though str.split() / splitlines() would
+# break them up - CJK and phone-export filenames have these
+ROUND_TRIP_VALUES = [
+    "写真\u3000001.jpg",
+    "/p/IMG\xa01.jpg",
+    "/p/em\u2003space.jpg",
+    "/p/next\x85line.jpg",
+    "/p/line\u2028sep.jpg",
+    "/p/trailing\xa0",
+    "/p/My Photos/IMG 1.jpg",
+    "say \"cheese\".jpg",
+]
+
+def check_round_trip():
+    """Exit if any value doesn't come back unchanged from Logfmter().format through both parse paths"""
+    formatter = Logfmter()
+    lines = []
+    for value in ROUND_TRIP_VALUES:
+        record = logging.LogRecord("bench", logging.INFO, __file__, 0, {"msg": "File Discovered", "entry": value}, None, None)
+        lines.append(formatter.format(record))
+
+    for value, line, buffered in zip(ROUND_TRIP_VALUES, lines, parse_logfmt_buffer("\n".join(lines)), strict=True):
+        for parsed in (parse_logfmt(line), buffered):
+            if parsed.get("entry") != value or len(parsed) != 3:
+                sys.exit(f"round trip failed for {value!r}: {line!r} parsed as {parsed!r}")
+
+def old_path(lines):
+    for line in lines:
+        for parsed in parse([line]):
+            dict(parsed)
+
+def new_path(lines):
+    for line in lines:
+        parse_logfmt(line)
+
+def new_buffer_path(text):
+    for _ in parse_logfmt_buffer(text):
+        pass
+
+def best_of(fn, arg, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+check_round_trip()
+
+files = [Path(p) for p in sys.argv[1:]] or sorted(Path("logs").glob("*.log"))
+text = "".join(f.read_text() for f in files)
+lines = [line for line in text.split("\n") if line]
+
+# Quoted values exercise the slow path, so measure those on their own too
+quoted = [
+    f'at=INFO msg="File Discovered" entry="/home/user/My Photos/IMG {i:05d}.jpg" root="/home/user/My Photos"'
+    for i in range(len(lines) or 10000)
+]
+
+print(f"{len(lines)} lines from {len(files)} files")
+for name, sample in (("logs", lines), ("quoted", quoted)):
+    old = best_of(old_path, sample)
+    new = best_of(new_path, sample)
+    buffered = best_of(new_buffer_path, "\n".join(sample))
+    print(f"{name:>8}  logfmt.parse: {len(sample) / old:>12,.0f} lines/sec")
+    print(f"{name:>8}  parse_logfmt: {len(sample) / new:>12,.0f} lines/sec  ({old / new:.1f}x)")
+    print(f"{name:>8}  buffer:       {len(sample) / buffered:>12,.0f} lines/sec  ({old / buffered:.1f}x)")
@@ -0,0 +1,116 @@
+#!/usr/bin/env -S uv run --script
+
+# /// script
+# requires-python = ">=3.14"
+# dependencies = [
+#     "logfmter",
+#     "logfmt",
+#     "rich",
+# ]
+# ///
+
+# Compare entries/sec of read_logs' single-pass Rich parser against the old
+# regex-per-line parser, over synthetic Rich output.
+#
+#   ./bench_read_logs.py                # 50,000 synthetic entries
+#   ./bench_read_logs.py 200000         # pick the entry count
+#   ./bench_read_logs.py captured.log   # benchmark against a captured terminal log
+
+import io
+import logging
+import re
+import sys
+import time
+from pathlib import Path
+from logfmt import parse
+from logfmter import Logfmter
+from rich.console import Console
+from rich.logging import RichHandler
+from read_logs import parse_multiline_logs
+
+# The regex parser read_logs.py used before the single-pass rewrite
+timestamp_pattern = re.compile(r'^\[(\d{2}/\d{2}/\d{2} \d{2}:\d{2}:\d{2})\]')
+new_entry_pattern = re.compile(r'^\s+(DEBUG|INFO|WARNING|ERROR|CRITICAL)\s+\w+=')
+
+def old_parse_multiline_logs(lines):
+    current_entry = None
+    current_timestamp = None
+    for line in lines:
+        match = timestamp_pattern.match(line)
+        if match or new_entry_pattern.match(line):
+            if current_entry is not None:
+                yield current_timestamp, current_entry
+            if match:
+                current_timestamp = match.group(1)
+                rest = line[match.end():].strip()
+            else:
+                rest = line.strip()
+            rest = re.sub(r'^(DEBUG|INFO|WARNING|ERROR|CRITICAL)\s+', '', rest)
+            rest = re.sub(r'\s+\S+\.py:\d+\s*$', '', rest)
+            current_entry = rest
+        elif current_entry is not None:
+            stripped = line.strip()
+            stripped = re.sub(r'^(DEBUG|INFO|WARNING|ERROR|CRITICAL)\s+', '', stripped)
+            stripped = re.sub(r'\s+\S+\.py:\d+\s*$', '', stripped)
+            if stripped:
+                if re.match(r'\w+=', stripped):
+                    current_entry += ' ' + stripped
+                else:
+                    current_entry += stripped
+    if current_entry is not None:
+        yield current_timestamp, current_entry
+
+def old_path(lines):
+    for timestamp, logfmt_line in old_parse_multiline_logs(lines):
+        for entry in parse([logfmt_line]):
+            entry['timestamp'] = timestamp
+
+def new_path(lines):
+    for _ in parse_multiline_logs(lines):
+        pass
+
+def synthetic_rich_output(count, width=120):
+    """Render count events through RichHandler the way a terminal session would show them"""
+    buffer = io.StringIO()
+    handler = RichHandler(console=Console(file=buffer, width=width, no_color=True))
+    handler.setFormatter(Logfmter(keys=["at"], mapping={"at": "levelname"}))
+    logger = logging.getLogger("bench_read_logs")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(handler)
+    for i in range(count):
+        entry = f"/home/user/Pictures/camera/2025/{i % 12:02d}/IMG_{i:06d}.jpg"
+        if i % 3:
+            logger.info({"msg": "File Discovered", "entry": entry, "root": "/home/user/Pictures"})
+        else:
+            logger.info({"msg": "File Hash Collected", "entry": entry, "algorithm": "blake2b",
+                         "hash": f"{i:0128x}"})
+    logger.removeHandler(handler)
+    return buffer.getvalue().splitlines(keepends=True)
+
+def best_of(fn, arg, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    arg = sys.argv[1] if len(sys.argv) > 1 else "50000"
+    if arg.isdigit():
+        lines = synthetic_rich_output(int(arg))
+        source = "synthetic"
+    else:
+        lines = Path(arg).read_text().splitlines(keepends=True)
+        source = arg
+
+    entries = sum(1 for _ in parse_multiline_logs(lines))
+    print(f"{entries} entries over {len(lines)} lines ({source})")
+    old = best_of(old_path, lines)
+    new = best_of(new_path, lines)
+    print(f"  regex parser:       {entries / old:>12,.0f} entries/sec")
+    print(f"  single-pass parser: {entries / new:>12,.0f} entries/sec  ({old / new:.1f}x)")
+
+if __name__ == "__main__":
+    main()
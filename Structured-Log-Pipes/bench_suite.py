@@ -0,0 +1,327 @@
+#!/usr/bin/env -S uv run --script
+
+# /// script
+# requires-python = ">=3.14"
+# dependencies = [
+#     "logfmter",
+#     "rich",
+# ]
+# ///
+
+# Throughput benchmark for the whole pipeline, meant to be compared between commits.
+#
+# Builds a synthetic logs/ directory and a synthetic file tree in a scratch
+# directory, then times the log readers and the scan -> stat -> hash ->
+# analyze stages against them. Every case runs in its own process so its
+# peak RSS can be reported, and the fastest of --repeat runs is kept.
+# Results are written as JSON.
+#
+#   ./bench_suite.py > before.json
+#   git switch my-branch
+#   ./bench_suite.py --compare before.json > after.json
+#
+# Stages are chained the way a shell pipe would chain them - each one reads
+# the previous one's stdout - so the numbers don't depend on whether the
+# benchmark itself was started from a terminal.
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+MSGS = ("File Discovered", "File Stat Collected", "File Hash Collected")
+
+def generate_logs(logs_path, files=8, events=200_000, duplicate_ratio=0.2, seed=0):
+    """Write `events` logfmt lines spread over `files` log files, a duplicate_ratio share repeating earlier lines"""
+    rng = random.Random(seed)
+    logs_path.mkdir(parents=True, exist_ok=True)
+    written = []
+    total_bytes = 0
+
+    per_file = max(1, events // files)
+    for n in range(files):
+        lines = []
+        for i in range(n * per_file, min(events, (n + 1) * per_file)):
+            if written and rng.random() < duplicate_ratio:
+                lines.append(rng.choice(written))
+                continue
+            entry = f"/home/user/Pictures/camera/{i % 97:03d}/IMG_{i:08d}.jpg"
+            msg = MSGS[i % len(MSGS)]
+            if msg == "File Discovered":
+                line = f'at=INFO msg="{msg}" entry={entry} root=/home/user/Pictures'
+            elif msg == "File Stat Collected":
+                line = (f'at=INFO msg="{msg}" entry={entry} root=/home/user/Pictures '
+                        f'size_bytes={rng.randrange(1 << 24)} mtime={1.7e9 + i:.6f}')
+            else:
+                line = f'at=INFO msg="{msg}" entry={entry} hash={rng.getrandbits(512):0128x} algorithm=blake2b'
+            # Keep a bounded pool to draw duplicates from
+            if len(written) < 10_000:
+                written.append(line)
+            else:
+                written[rng.randrange(len(written))] = line
+            lines.append(line)
+
+        text = "\n".join(lines) + "\n"
+        (logs_path / f"{n + 1}_20250101_{n:06d}_bench.log").write_text(text)
+        total_bytes += len(text.encode())
+
+    return total_bytes
+
+def generate_tree(root, files=2_000, median_kb=256, duplicate_ratio=0.1, seed=0):
+    """Write a tree of files with log-normally distributed sizes (a few big, many small), some of them copies"""
+    rng = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    written = []
+    total_bytes = 0
+
+    for i in range(files):
+        directory = root / f"dir{i % 23:02d}" / f"sub{i % 7}"
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"file{i:06d}.bin"
+        if written and rng.random() < duplicate_ratio:
+            shutil.copyfile(rng.choice(written), path)
+        else:
+            size = int(rng.lognormvariate(0, 1.2) * median_kb * 1024)
+            path.write_bytes(rng.randbytes(size))
+            written.append(path)
+        total_bytes += path.stat().st_size
+
+    return total_bytes
+
+def _run_once(cmd, cwd, stdin, stdout):
+    with contextlib.ExitStack() as files:
+        stdin_file = files.enter_context(open(stdin, 'rb')) if stdin else subprocess.DEVNULL
+        stdout_file = files.enter_context(open(stdout, 'wb')) if stdout else subprocess.DEVNULL
+
+        start = time.perf_counter()
+        process = subprocess.Popen(cmd, cwd=cwd, stdin=stdin_file, stdout=stdout_file, stderr=subprocess.DEVNULL)
+        # wait4 gives this child's own resource usage, not the max over all children
+        _, status, usage = os.wait4(process.pid, 0)
+        seconds = time.perf_counter() - start
+
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd)
+
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return seconds, usage.ru_maxrss * scale / 2**20
+
+def run_measured(cmd, cwd=None, stdin=None, stdout=None, repeat=1, reset=None):
+    """Run cmd `repeat` times, returning the fastest run's (seconds, peak RSS in MB) for just that process
+
+    stdin and stdout are file paths (or None). reset, if given, is called
+    before every run to put the scratch state back.
+    """
+    best = None
+    for _ in range(repeat):
+        if reset is not None:
+            reset()
+        run = _run_once(cmd, cwd, stdin, stdout)
+        if best is None or run[0] < best[0]:
+            best = run
+    return best
+
+def result(name, seconds, peak_rss_mb, events=None, nbytes=None):
+    row = {"name": name, "seconds": round(seconds, 4), "peak_rss_mb": round(peak_rss_mb, 1)}
+    if events is not None:
+        row["events"] = events
+        row["events_per_sec"] = round(events / seconds, 1)
+    if nbytes is not None:
+        row["bytes"] = nbytes
+        row["mb_per_sec"] = round(nbytes / 2**20 / seconds, 2)
+    return row
+
+# Read cases, run in a child process via `bench_suite.py --read-case NAME LOGS_DIR`.
+# They go through the public readers with stdin reported as a terminal, so
+# read_logs() and query() read the log files whether or not the benchmark
+# has a terminal on stdin. Each prints how many events it read.
+READ_CASES = ("read_logs", "read_logs_compact", "read_logs_parallel", "log_index_cold", "log_index_warm", "query_one_msg")
+
+def read_case(name, logs_dir):
+    sys.path.insert(0, str(SCRIPT_DIR))
+    import slap
+
+    # The readers switch to stdin whenever it isn't a terminal
+    sys.stdin.isatty = lambda: True
+
+    logs_path = Path(logs_dir)
+    if name in ("read_logs", "read_logs_compact"):
+        snapshot = slap.read_logs(logs_path, use_index=False, compact=name.endswith("compact"))
+    elif name == "read_logs_parallel":
+        snapshot = slap.read_logs(logs_path, use_index=False, workers=os.cpu_count() or 1)
+    elif name in ("log_index_cold", "log_index_warm"):
+        # read_logs()'s default path - the index next to the logs directory
+        if name == "log_index_cold":
+            resolved = logs_path.resolve()
+            for stale in resolved.parent.glob(resolved.name + ".index.sqlite*"):
+                stale.unlink()
+        snapshot = slap.read_logs(logs_path)
+    elif name == "query_one_msg":
+        snapshot = slap.query("File Hash Collected", logs_dir=logs_path)
+    else:
+        raise ValueError(f"unknown read case {name!r}")
+
+    print(sum(len(events) for events in snapshot.values()))
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def count_lines(path):
+    with open(path, 'rb') as f:
+        return sum(1 for _ in f)
+
+def count_events(path, msg):
+    """Count a stage's own product events in its output, not its errors or Stage Completed"""
+    sys.path.insert(0, str(SCRIPT_DIR))
+    import slap
+
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return sum(1 for line in f if (event := slap._parse_event(line)) is not None and event[0] == msg)
+
+def run_suite(args, workdir):
+    results = []
+    python = sys.executable
+
+    # Log readers
+    logs_path = workdir / "logs"
+    log_bytes = generate_logs(logs_path, args.log_files, args.events, args.duplicate_ratio, args.seed)
+    print(f"generated {args.events} events in {args.log_files} log files ({log_bytes / 2**20:.1f} MB)", file=sys.stderr)
+    for name in READ_CASES:
+        read_output = workdir / f"{name}.out"
+        seconds, rss = run_measured(
+            [python, str(Path(__file__).resolve()), "--read-case", name, str(logs_path)],
+            stdout=read_output, repeat=args.repeat,
+        )
+        # A query only reads the events it matches - the rest are skipped unparsed
+        events = int(read_output.read_text()) if name == "query_one_msg" else args.events
+        results.append(result(name, seconds, rss, events=events, nbytes=log_bytes))
+
+    # Pipeline stages, run from a copy of the scripts so their logs/ stay in the scratch dir
+    stage_dir = workdir / "stages"
+    stage_dir.mkdir()
+    for script in SCRIPT_DIR.glob("*.py"):
+        shutil.copy(script, stage_dir)
+
+    tree = workdir / "tree"
+    tree_bytes = generate_tree(tree, args.tree_files, args.median_kb, args.duplicate_ratio, args.seed)
+    print(f"generated {args.tree_files} files ({tree_bytes / 2**20:.1f} MB)", file=sys.stderr)
+
+    def reset_stage_logs():
+        # Stages skip work their logs (or the hash cache) say is done, so every run starts from scratch
+        shutil.rmtree(stage_dir / "logs", ignore_errors=True)
+        for state_file in [*stage_dir.glob("logs.index.sqlite*"), *stage_dir.glob("hash.cache.sqlite*")]:
+            state_file.unlink()
+
+    outputs = {}
+    stages = [
+        ("scan_partition", [str(tree)], None, "File Discovered", None),
+        ("stat_partition", [], "scan_partition", "File Stat Collected", None),
+        ("hash_items", [], "scan_partition", "File Hash Collected", tree_bytes),
+    ]
+    for name, stage_args, upstream, produces, nbytes in stages:
+        outputs[name] = workdir / f"{name}.out"
+        seconds, rss = run_measured(
+            [python, f"{name}.py", *stage_args], cwd=stage_dir,
+            stdin=outputs.get(upstream), stdout=outputs[name],
+            repeat=args.repeat, reset=reset_stage_logs,
+        )
+        results.append(result(name, seconds, rss, events=count_events(outputs[name], produces), nbytes=nbytes))
+
+    # analyze_data reads everything the stages emitted
+    combined = workdir / "combined.out"
+    with open(combined, 'wb') as out:
+        for path in outputs.values():
+            out.write(path.read_bytes())
+    seconds, rss = run_measured([python, "analyze_data.py"], cwd=stage_dir, stdin=combined,
+                                repeat=args.repeat, reset=reset_stage_logs)
+    results.append(result("analyze_data", seconds, rss, events=count_lines(combined)))
+
+    return results
+
+def compare(results, baseline_path):
+    """Print each case's change in throughput against a previous run to stderr"""
+    baseline = {row["name"]: row for row in json.loads(Path(baseline_path).read_text())["results"]}
+    print(f"{'case':<20} {'before':>12} {'after':>12} {'change':>8}  {'rss':>14}", file=sys.stderr)
+    for row in results:
+        old = baseline.get(row["name"])
+        if old is None:
+            continue
+        # Higher is better for both rates, so compare whichever the case reports
+        metric = "events_per_sec" if "events_per_sec" in row else "mb_per_sec"
+        before, after = old.get(metric), row.get(metric)
+        if not before or not after:
+            continue
+        print(f"{row['name']:<20} {before:>12,.0f} {after:>12,.0f} {after / before - 1:>+7.1%}"
+              f"  {old['peak_rss_mb']:>6.0f}->{row['peak_rss_mb']:<6.0f}MB", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the log readers and pipeline stages on synthetic data")
+    parser.add_argument("--events", type=int, default=200_000, help="events in the synthetic logs (default: 200000)")
+    parser.add_argument("--log-files", type=int, default=8, help="log files to spread them over (default: 8)")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.2,
+                        help="share of repeated log lines, and of copied files in the tree (default: 0.2)")
+    parser.add_argument("--tree-files", type=int, default=2_000, help="files in the synthetic tree (default: 2000)")
+    parser.add_argument("--median-kb", type=int, default=256, help="median file size in KB (default: 256)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the fastest is reported (default: 3)")
+    parser.add_argument("--workdir", help="scratch directory to use and keep (default: a temporary one)")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", metavar="BASELINE", help="a previous JSON report to compare against")
+    parser.add_argument("--read-case", nargs=2, metavar=("NAME", "LOGS_DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.read_case:
+        read_case(*args.read_case)
+        return
+
+    if args.workdir:
+        workdir = Path(args.workdir)
+        workdir.mkdir(parents=True, exist_ok=False)
+        results = run_suite(args, workdir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="slap-bench-") as tmp:
+            results = run_suite(args, Path(tmp))
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "params": {
+            "events": args.events,
+            "log_files": args.log_files,
+            "duplicate_ratio": args.duplicate_ratio,
+            "tree_files": args.tree_files,
+            "median_kb": args.median_kb,
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
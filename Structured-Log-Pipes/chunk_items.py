@@ -0,0 +1,99 @@
+#!/usr/bin/env -S uv run --script
+
+# /// script
+# requires-python = ">=3.14"
+# dependencies = [
+#     "logfmter",
+#     "rich",
+# ]
+# ///
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
+from chunking import chunk_file, DEFAULT_MIN_SIZE, DEFAULT_AVG_SIZE, DEFAULT_MAX_SIZE
+from slap import setup_logging, log_kw, iter_pending, StageMetrics
+
+
+def chunk_discovery(discovery, min_size=DEFAULT_MIN_SIZE, avg_size=DEFAULT_AVG_SIZE, max_size=DEFAULT_MAX_SIZE):
+    """Chunk one discovered file in a worker process.
+
+    Returns (File Chunked fields, [(offset, length, hash), ...], milliseconds
+    taken), or (None, error message, milliseconds) if the file couldn't be read.
+    """
+    start = time.perf_counter()
+    try:
+        chunks, manifest = chunk_file(discovery['entry'], min_size, avg_size, max_size)
+    except (OSError, PermissionError) as e:
+        return None, str(e), (time.perf_counter() - start) * 1000
+
+    fields = dict(
+        entry=discovery['entry'],
+        root=discovery['root'],
+        size_bytes=sum(length for _, length, _ in chunks),
+        chunks=len(chunks),
+        manifest=manifest,
+        algorithm="blake2b",
+        min_size=min_size,
+        avg_size=avg_size,
+        max_size=max_size,
+    )
+    return fields, chunks, (time.perf_counter() - start) * 1000
+
+def log_chunked(discovery, result, stage):
+    """Log a finished file - every chunk, then the File Chunked manifest that marks it done"""
+    fields, chunks, duration_ms = result
+    if fields is None:
+        log_kw("File Chunk Error", err=True, entry=discovery['entry'], error=chunks)
+        stage.record(discovery['entry'], duration_ms)
+        return
+
+    for offset, length, chunk_hash in chunks:
+        log_kw("File Chunk Collected", entry=fields['entry'], offset=offset, length=length, hash=chunk_hash, algorithm="blake2b")
+    log_kw("File Chunked", **fields)
+    stage.record(fields['entry'], duration_ms, fields['size_bytes'])
+
+def main():
+    parser = argparse.ArgumentParser(description="Split discovered files into content-defined (FastCDC) chunks")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 4,
+        help="processes chunking files at once (default: number of CPUs)",
+    )
+    parser.add_argument("--min-size", type=int, default=DEFAULT_MIN_SIZE, help=f"smallest chunk in bytes (default: {DEFAULT_MIN_SIZE})")
+    parser.add_argument("--avg-size", type=int, default=DEFAULT_AVG_SIZE, help=f"target average chunk in bytes (default: {DEFAULT_AVG_SIZE})")
+    parser.add_argument("--max-size", type=int, default=DEFAULT_MAX_SIZE, help=f"largest chunk in bytes (default: {DEFAULT_MAX_SIZE})")
+    args = parser.parse_args()
+
+    if not args.min_size <= args.avg_size <= args.max_size:
+        parser.error("chunk sizes must satisfy --min-size <= --avg-size <= --max-size")
+
+    setup_logging()
+
+    workers = max(1, args.workers)
+    with StageMetrics("chunk") as stage, ProcessPoolExecutor(max_workers=workers) as pool:
+        # The rolling hash is pure Python and CPU bound, so files are chunked
+        # in separate processes. Only a couple of files per worker are in
+        # flight at once, which keeps memory flat and, when piped, pushes
+        # back on the upstream stage.
+        in_flight = {}
+
+        def drain(return_when):
+            done, _ = wait(in_flight, return_when=return_when)
+            for future in done:
+                log_chunked(in_flight.pop(future), future.result(), stage)
+
+        # skip anything a previous run already finished - when piped, files
+        # are chunked as they are discovered rather than after the scan is done
+        for discovery in iter_pending('File Discovered', 'File Chunked'):
+            if len(in_flight) >= 2 * workers:
+                drain(FIRST_COMPLETED)
+            future = pool.submit(chunk_discovery, discovery, args.min_size, args.avg_size, args.max_size)
+            in_flight[future] = discovery
+
+        if in_flight:
+            drain(ALL_COMPLETED)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import hashlib
+
+# Content-defined chunking with FastCDC (Xia et al., 2016): a Gear rolling
+# hash picks chunk boundaries from the bytes themselves, so an insertion or
+# an appended tail only changes the chunks around it - every other chunk,
+# and its hash, comes out the same as in the original file.
+
+# Chunk sizes suited to photo and video archives - big enough that the
+# per-chunk log events stay a rounding error next to the data
+DEFAULT_MIN_SIZE = 64 << 10
+DEFAULT_AVG_SIZE = 256 << 10
+DEFAULT_MAX_SIZE = 1 << 20
+
+# Bytes pulled from the file per read, and kept ahead of the chunk being cut
+READ_SIZE = 4 << 20
+
+_MASK_32 = 0xFFFFFFFF
+
+# One pseudo-random 32-bit value per byte value. Derived rather than random,
+# so every run (and every machine) cuts the same file at the same offsets.
+GEAR = tuple(
+    int.from_bytes(hashlib.blake2b(bytes([i]), digest_size=4).digest(), "little")
+    for i in range(256)
+)
+
+def _high_bits_mask(bits):
+    """A mask of the top `bits` bits of the 32-bit hash - those depend on the most recent bytes' whole window"""
+    return ((1 << bits) - 1) << (32 - bits)
+
+def _masks(avg_size):
+    """FastCDC's normalized masks: harder to match before avg_size, easier after"""
+    bits = max(1, avg_size.bit_length() - 1)
+    return _high_bits_mask(bits + 1), _high_bits_mask(max(1, bits - 1))
+
+def cut_point(data, start, end, min_size, avg_size, max_size, mask_small, mask_large):
+    """Length of the chunk starting at data[start], looking no further than data[end]"""
+    remaining = end - start
+    if remaining <= min_size:
+        return remaining
+    limit = start + min(remaining, max_size)
+    normal = start + min(remaining, avg_size)
+
+    # Bytes before min_size can never end a chunk, so skip hashing them
+    gear = GEAR
+    h = 0
+    i = start + min_size
+    while i < normal:
+        h = ((h << 1) + gear[data[i]]) & _MASK_32
+        if not h & mask_small:
+            return i - start + 1
+        i += 1
+    while i < limit:
+        h = ((h << 1) + gear[data[i]]) & _MASK_32
+        if not h & mask_large:
+            return i - start + 1
+        i += 1
+    return limit - start
+
+def iter_chunks(file_path, min_size=DEFAULT_MIN_SIZE, avg_size=DEFAULT_AVG_SIZE, max_size=DEFAULT_MAX_SIZE,
+                algorithm="blake2b"):
+    """Split a file into content-defined chunks, yielding (offset, length, hex digest) for each"""
+    if not min_size <= avg_size <= max_size:
+        raise ValueError("chunk sizes must satisfy min_size <= avg_size <= max_size")
+    mask_small, mask_large = _masks(avg_size)
+
+    with open(file_path, 'rb', buffering=0) as f:
+        buffer = bytearray()
+        position = 0  # start of the next chunk within buffer
+        offset = 0    # file offset of buffer[position]
+        eof = False
+
+        while True:
+            # Keep at least one max-size chunk ahead so a cut is never made early
+            if not eof and len(buffer) - position < max_size:
+                del buffer[:position]
+                position = 0
+                while len(buffer) < max_size + READ_SIZE:
+                    data = f.read(READ_SIZE)
+                    if not data:
+                        eof = True
+                        break
+                    buffer += data
+
+            if position == len(buffer):
+                return
+
+            length = cut_point(buffer, position, len(buffer), min_size, avg_size, max_size, mask_small, mask_large)
+            with memoryview(buffer)[position:position + length] as chunk:
+                digest = hashlib.new(algorithm, chunk).hexdigest()
+            yield offset, length, digest
+
+            position += length
+            offset += length
+
+def chunk_file(file_path, min_size=DEFAULT_MIN_SIZE, avg_size=DEFAULT_AVG_SIZE, max_size=DEFAULT_MAX_SIZE,
+               algorithm="blake2b"):
+    """Chunk a whole file, returning (chunks, manifest hash).
+
+    The manifest hash covers the ordered chunk digests, so two files with the
+    same manifest are made of the same chunks in the same order.
+    """
+    chunks = list(iter_chunks(file_path, min_size, avg_size, max_size, algorithm))
+    manifest = hashlib.new(algorithm)
+    for _, _, digest in chunks:
+        manifest.update(bytes.fromhex(digest))
+    return chunks, manifest.hexdigest()
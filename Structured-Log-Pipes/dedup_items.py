@@ -0,0 +1,157 @@
+#!/usr/bin/env -S uv run --script
+
+# /// script
+# requires-python = ">=3.14"
+# dependencies = [
+#     "logfmter",
+#     "logfmt",
+#     "pandas",
+#     "rich",
+# ]
+# ///
+
+# Find duplicate files while reading as few bytes as possible.
+#
+# Tier 1 joins the "File Stat Collected" events on size_bytes - a file with
+# a size nobody else has can't be a duplicate, so it is never opened.
+# Tier 2 hashes only the head and tail of files whose sizes collide.
+# Tier 3 fully hashes only files whose partial hashes also collide, logging
+# the same "File Hash Collected" events as hash_items.py.
+
+import argparse
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from hashing import hash_file, partial_hash_file, PARTIAL_BLOCK_SIZE
+from slap import query, setup_logging, log_kw
+
+
+def partial_hash_item(stat, block_size):
+    """Partial hash one file and log the result, returning the hash or None on error"""
+    file_path = stat['entry']
+
+    try:
+        partial_hash = partial_hash_file(file_path, block_size)
+
+        log_kw(
+            "File Partial Hash Collected",
+            entry=file_path,
+            root=stat['root'],
+            size_bytes=stat['size_bytes'],
+            modified=stat.get('modified'),
+            partial_hash=partial_hash,
+            block_size=block_size,
+            algorithm="blake2b",
+        )
+        return partial_hash
+    except (OSError, PermissionError) as e:
+        log_kw("File Partial Hash Error", err=True, entry=file_path, error=str(e))
+        return None
+
+def full_hash_item(stat):
+    """Fully hash one file and log the result, like hash_items.py, along with the size and mtime it was taken under"""
+    file_path = stat['entry']
+
+    try:
+        file_hash = hash_file(file_path, "blake2b")
+
+        log_kw(
+            "File Hash Collected",
+            entry=file_path,
+            root=stat['root'],
+            hash=file_hash,
+            algorithm="blake2b",
+            size_bytes=stat['size_bytes'],
+            modified=stat.get('modified'),
+        )
+    except (OSError, PermissionError) as e:
+        log_kw("File Hash Error", err=True, entry=file_path, error=str(e))
+
+def stat_key(event):
+    """What a partial or full hash was taken under - reusable only while the file's size and mtime still match"""
+    return event['entry'], int(event['size_bytes']), event.get('modified')
+
+def main():
+    parser = argparse.ArgumentParser(description="Find duplicate files by size, then partial hash, then full hash")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 4,
+        help="number of files to hash at once (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--block-size", type=int, default=PARTIAL_BLOCK_SIZE,
+        help=f"bytes read from each end of a file for the partial hash (default: {PARTIAL_BLOCK_SIZE})",
+    )
+    args = parser.parse_args()
+
+    setup_logging()
+
+    log_snapshot = query(['File Stat Collected', 'File Partial Hash Collected', 'File Hash Collected'])
+
+    # One stat per file - if it was stat'd more than once, the one with the
+    # newest mtime describes what's on disk now (log order says nothing,
+    # log files sort by PID)
+    stats = {}
+    for stat in log_snapshot.get('File Stat Collected', []):
+        current = stats.get(stat['entry'])
+        if current is None or str(stat.get('modified', '')) > str(current.get('modified', '')):
+            stats[stat['entry']] = stat
+
+    # Tier 1 - join on size
+    by_size = defaultdict(list)
+    for stat in stats.values():
+        by_size[int(stat['size_bytes'])].append(stat)
+
+    size_candidates = [stat for group in by_size.values() if len(group) > 1 for stat in group]
+    for stat in size_candidates:
+        log_kw(
+            "Size Collision Found",
+            entry=stat['entry'],
+            root=stat['root'],
+            size_bytes=stat['size_bytes'],
+            copies=len(by_size[int(stat['size_bytes'])]),
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        # Tier 2 - partial hashes, reusing any a previous run logged for the
+        # same size and mtime - a file that changed since is hashed again
+        partial_hashes = {
+            stat_key(event): event['partial_hash']
+            for event in log_snapshot.get('File Partial Hash Collected', [])
+            if int(event.get('block_size', 0)) == args.block_size
+        }
+        todo = [stat for stat in size_candidates if stat_key(stat) not in partial_hashes]
+        for stat, partial_hash in zip(todo, pool.map(lambda s: partial_hash_item(s, args.block_size), todo)):
+            if partial_hash is not None:
+                partial_hashes[stat_key(stat)] = partial_hash
+
+        by_partial = defaultdict(list)
+        for stat in size_candidates:
+            if (partial_hash := partial_hashes.get(stat_key(stat))) is not None:
+                by_partial[(int(stat['size_bytes']), partial_hash)].append(stat)
+
+        partial_candidates = [stat for group in by_partial.values() if len(group) > 1 for stat in group]
+
+        # Tier 3 - full hashes for whatever still looks identical, with the
+        # same reuse rule as tier 2. Hashes logged without a size and mtime
+        # (e.g. by hash_items.py) can't be checked, so those files are read again.
+        hashed = {
+            stat_key(event) for event in log_snapshot.get('File Hash Collected', [])
+            if event.get('algorithm') == "blake2b" and 'size_bytes' in event
+        }
+        todo = [stat for stat in partial_candidates if stat_key(stat) not in hashed]
+        list(pool.map(full_hash_item, todo))
+
+    total_bytes = sum(int(stat['size_bytes']) for stat in stats.values())
+    fully_read_bytes = sum(int(stat['size_bytes']) for stat in partial_candidates)
+    log_kw(
+        "Dedup Summary",
+        files=len(stats),
+        size_candidates=len(size_candidates),
+        partial_candidates=len(partial_candidates),
+        total_bytes=total_bytes,
+        fully_read_bytes=fully_read_bytes,
+    )
+
+
+if __name__ == "__main__":
+    main()
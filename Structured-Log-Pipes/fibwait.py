@@ -1,10 +1,11 @@
 #!/usr/bin/python3
 
-import time
-import json
+import argparse
+import asyncio
 import sys
 
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
+from reactor import Reactor, DEFAULT_CONCURRENCY, emit
 
 @dataclass
 class Event: pass # just for typing
@@ -14,25 +15,22 @@ class FibEvent(Event):
     a: int
     b: int
 
-def emit(event: Event):
-    print(json.dumps(asdict(event)))
+reactor = Reactor()
 
-def fibwait(a = 1, b = 1):
-    time.sleep(a)
+@reactor.on(FibEvent)
+async def fibwait(event: FibEvent):
+    await asyncio.sleep(event.a)
 
-    emit(FibEvent(a=b, b=a+b))
-
-def parse_events():
-    for line in sys.stdin:
-        try:
-            data = json.loads(line.strip())
-            event = FibEvent(**data)
-            fibwait(event.a, event.b)
-        except (json.JSONDecodeError, TypeError) as e:
-            print(f"Error parsing event: {e}", file=sys.stderr)
+    return FibEvent(a=event.b, b=event.a + event.b)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Wait a, then emit the next Fibonacci pair")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Events waited on at once (default: {DEFAULT_CONCURRENCY})")
+    args = parser.parse_args()
+    reactor.concurrency = args.concurrency
+
     if not sys.stdin.isatty():
-        parse_events()
+        reactor.run()
     else:
-        fibwait()
\ No newline at end of file
+        emit(asyncio.run(fibwait(FibEvent(a=1, b=1))))
@@ -10,41 +10,193 @@
 # ]
 # ///
 
-import hashlib
+import argparse
+import functools
+import os
+import queue
+import threading
 from pathlib import Path
-from slap import read_logs, setup_logging, log_kw
+from hashing import hash_file_multi, new_hasher, HashCache, DEFAULT_CHUNK_SIZE
+from slap import setup_logging, log_kw, iter_pending, iter_query, StageMetrics
 
-setup_logging()
+# Kept next to the script, like the logs directory
+DEFAULT_CACHE = Path(__file__).resolve().parent / "hash.cache.sqlite"
 
-log_snapshot = read_logs()
+# BLAKE2b is what the CAS and duplicate analysis key on
+DEFAULT_ALGORITHMS = ("blake2b",)
 
-for discovery in log_snapshot.get('File Discovered', []):
+def algorithm_list(value):
+    """argparse type for --algorithms: a comma-separated list of digests new_hasher knows"""
+    algorithms = tuple(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+    if not algorithms:
+        raise argparse.ArgumentTypeError("no algorithms given")
+    for algorithm in algorithms:
+        try:
+            # hexdigest() too - variable-length digests like shake_128 need a length it can't give
+            new_hasher(algorithm).hexdigest()
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e)) from None
+        except TypeError:
+            raise argparse.ArgumentTypeError(f"{algorithm} has no fixed digest length") from None
+    return algorithms
+
+
+def hash_discovery(discovery, chunk_size=DEFAULT_CHUNK_SIZE, use_mmap=False, cache=None, verify=False, item=None,
+                   algorithms=DEFAULT_ALGORITHMS):
+    """Hash one discovered file and return File Hash Collected fields for each algorithm, or None if it failed
+
+    All the digests come from a single read of the file. With a cache, a
+    digest whose device, inode, size and mtime_ns match a previous hash is
+    taken from it, and the file isn't read at all if every digest is.
+    verify=True reads it anyway, refreshes the cache and logs a File Hash
+    Mismatch if the contents changed under an unchanged stat. The stage
+    item, if given, is credited with the bytes actually read.
+    """
     file_path = discovery['entry']
     root = discovery['root']
 
-    # one way to pro-actively guard against duplicating work
-    if 'File Hash Collected' in log_snapshot:
-        already_hashed = any(hash_entry['entry'] == file_path for hash_entry in log_snapshot['File Hash Collected'])
-        if already_hashed:
-            continue
-
     try:
-        # Use BLAKE2b for fast, secure hashing
-        hasher = hashlib.blake2b()
-
-        with open(file_path, 'rb') as f:
-            # Read in chunks to handle large files efficiently
-            while chunk := f.read(8192):
-                hasher.update(chunk)
-
-        file_hash = hasher.hexdigest()
-
-        log_kw(
-            "File Hash Collected",
-            entry=file_path,
-            root=root,
-            hash=file_hash,
-            algorithm="blake2b",
-        )
+        # Stat before reading, so a write during hashing leaves a stale key behind rather than a wrong hash
+        stat_result = os.stat(file_path)
+
+        hashes = {}
+        if cache is not None and not verify:
+            for algorithm in algorithms:
+                if (cached := cache.get(stat_result, algorithm)) is not None:
+                    hashes[algorithm] = cached
+
+        if missing := [algorithm for algorithm in algorithms if algorithm not in hashes]:
+            computed = hash_file_multi(file_path, missing, chunk_size=chunk_size, use_mmap=use_mmap)
+            if item is not None:
+                item.bytes = stat_result.st_size
+
+            if cache is not None:
+                for algorithm, file_hash in computed.items():
+                    if verify and (cached := cache.get(stat_result, algorithm, count=False)) not in (None, file_hash):
+                        log_kw("File Hash Mismatch", err=True, entry=file_path, algorithm=algorithm, cached_hash=cached, hash=file_hash)
+                    cache.put(stat_result, file_hash, algorithm)
+            hashes.update(computed)
+
+        return [
+            dict(
+                entry=file_path,
+                root=root,
+                hash=hashes[algorithm],
+                algorithm=algorithm,
+            )
+            for algorithm in algorithms
+        ]
     except (OSError, PermissionError) as e:
         log_kw("File Hash Error", err=True, entry=file_path, error=str(e))
+        return None
+
+def hash_worker(work, hash_one, stage):
+    """Hash discoveries off the work queue until a None sentinel arrives, timing each as a stage item
+
+    Anything a discovery throws is logged as a File Hash Error for that file
+    rather than ending the thread - with every worker gone, the producer
+    would block forever on the full queue.
+    """
+    while (discovery := work.get()) is not None:
+        with stage.item(discovery.get('entry')) as item:
+            try:
+                file_hashes = hash_one(discovery, item=item) or ()
+            except Exception as e:
+                log_kw("File Hash Error", err=True, entry=discovery.get('entry'), error=f"{type(e).__name__}: {e}")
+                continue
+            for file_hash in file_hashes:
+                log_kw("File Hash Collected", **file_hash)
+
+def all_discoveries():
+    """Every discovered file once, whether or not it was hashed before"""
+    seen = set()
+    for _, discovery in iter_query('File Discovered'):
+        if discovery.get('entry') not in seen:
+            seen.add(discovery.get('entry'))
+            yield discovery
+
+def main():
+    parser = argparse.ArgumentParser(description="Hash discovered files, with any number of digests per read")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 4,
+        help="number of files to hash at once (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--queue-size", type=int, default=256,
+        help="how many discovered files may wait for a worker (default: 256)",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+        help=f"bytes hashed per read (default: {DEFAULT_CHUNK_SIZE})",
+    )
+    parser.add_argument(
+        "--algorithms", type=algorithm_list, default=DEFAULT_ALGORITHMS,
+        help="comma-separated digests to compute, all from one read, e.g. blake2b,sha256,crc32 "
+             "(any hashlib name, crc32, or xxh64/xxh3_64/xxh3_128 with xxhash installed; default: blake2b)",
+    )
+    parser.add_argument(
+        "--mmap", action="store_true",
+        help="hash memory-mapped files instead of reading into a buffer",
+    )
+    parser.add_argument(
+        "--rehash", action="store_true",
+        help="hash every discovered file again, not just ones the logs haven't seen hashed (unchanged files come from the cache)",
+    )
+    parser.add_argument(
+        "--verify", action="store_true",
+        help="read every file even when the cache has it, and log a File Hash Mismatch if the cached hash is wrong",
+    )
+    parser.add_argument(
+        "--cache", default=str(DEFAULT_CACHE),
+        help=f"hash cache database (default: {DEFAULT_CACHE.name} next to this script)",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="don't read or update the hash cache",
+    )
+    args = parser.parse_args()
+
+    setup_logging()
+
+    cache = None if args.no_cache else HashCache(args.cache)
+    hash_one = functools.partial(
+        hash_discovery, chunk_size=args.chunk_size, use_mmap=args.mmap, cache=cache, verify=args.verify,
+        algorithms=args.algorithms,
+    )
+
+    # skip anything a previous run already finished (every requested digest
+    # logged) - when piped, files are hashed as they are discovered rather
+    # than after the scan is done
+    if args.rehash or args.verify:
+        discoveries = all_discoveries()
+    else:
+        discoveries = iter_pending('File Discovered', 'File Hash Collected', require=('algorithm', args.algorithms))
+
+    # Logs a Stage Completed event with timings and throughput once all the workers are done
+    with StageMetrics("hash") as stage:
+        # hashlib releases the GIL while hashing, so threads keep several files
+        # (and disks) busy at once. The bounded queue keeps memory flat, and when
+        # piped it pushes back on the upstream stage once the workers fall behind.
+        work = queue.Queue(maxsize=args.queue_size)
+        workers = [
+            threading.Thread(target=hash_worker, args=(work, hash_one, stage), daemon=True)
+            for _ in range(max(1, args.workers))
+        ]
+        for worker in workers:
+            worker.start()
+
+        for discovery in discoveries:
+            work.put(discovery)
+
+        for _ in workers:
+            work.put(None)
+        for worker in workers:
+            worker.join()
+
+    if cache is not None:
+        log_kw("Hash Cache Summary", hits=cache.hits, misses=cache.misses, cache=args.cache)
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+import zlib
+
+# Bytes hashed per read. 1 MiB was at or near the top of bench_hashing.py
+# for every file size - big enough that per-call overhead disappears.
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Files at least this large get a sequential read-ahead hint from the kernel
+FADVISE_THRESHOLD = 64 << 20
+
+
+def _advise_sequential(fd, size):
+    """Tell the kernel a big file will be read front to back, where supported"""
+    if size >= FADVISE_THRESHOLD and hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+class _Crc32:
+    """zlib.crc32 behind the hashlib update/hexdigest interface"""
+    name = "crc32"
+
+    def __init__(self):
+        self.value = 0
+
+    def update(self, data):
+        self.value = zlib.crc32(data, self.value)
+
+    def hexdigest(self):
+        return f"{self.value:08x}"
+
+# Fast non-cryptographic digests from the optional xxhash package
+XXHASH_ALGORITHMS = ("xxh32", "xxh64", "xxh3_64", "xxh3_128")
+
+def new_hasher(algorithm):
+    """Return a fresh hasher for any hashlib algorithm, "crc32", or an xxhash one if xxhash is installed"""
+    if algorithm == "crc32":
+        return _Crc32()
+    if algorithm in XXHASH_ALGORITHMS:
+        try:
+            import xxhash
+        except ImportError:
+            raise ValueError(f"{algorithm} needs the xxhash package (e.g. uv run --with xxhash)") from None
+        return getattr(xxhash, algorithm)()
+    return hashlib.new(algorithm)
+
+def hash_file_multi(file_path, algorithms=("blake2b",), chunk_size=DEFAULT_CHUNK_SIZE, use_mmap=False):
+    """Hash a file's contents with several algorithms in one read, returning {algorithm: hex digest}.
+
+    Every chunk is read once and fed to each hasher in turn, so asking for
+    more digests costs CPU but no extra I/O. Reads go into one reusable
+    buffer with readinto, so hashing a multi-GB file doesn't allocate a new
+    bytes object per chunk. With use_mmap the file is mapped instead and
+    hashed straight out of the page cache.
+    """
+    hashers = {algorithm: new_hasher(algorithm) for algorithm in algorithms}
+    updates = [hasher.update for hasher in hashers.values()]
+
+    # Unbuffered - readinto fills our buffer directly, no second copy
+    with open(file_path, 'rb', buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        _advise_sequential(f.fileno(), size)
+
+        # Empty files can't be mapped, and there's nothing to gain for tiny ones
+        if use_mmap and size >= chunk_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if hasattr(mapped, "madvise"):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                with memoryview(mapped) as view:
+                    # Feed the mapping in chunks so other threads get the GIL back between updates
+                    for start in range(0, size, chunk_size):
+                        with view[start:start + chunk_size] as chunk:
+                            for update in updates:
+                                update(chunk)
+        else:
+            # No point zeroing a full chunk for a file smaller than one
+            buffer = bytearray(min(chunk_size, max(size, 1)))
+            with memoryview(buffer) as view:
+                while n := f.readinto(buffer):
+                    with view[:n] as chunk:
+                        for update in updates:
+                            update(chunk)
+
+    return {algorithm: hasher.hexdigest() for algorithm, hasher in hashers.items()}
+
+def hash_file(file_path, algorithm="blake2b", chunk_size=DEFAULT_CHUNK_SIZE, use_mmap=False):
+    """Hash a file's contents and return the hex digest (see hash_file_multi)"""
+    return hash_file_multi(file_path, (algorithm,), chunk_size, use_mmap)[algorithm]
+
+# Bytes read from each end of a file for its partial hash
+PARTIAL_BLOCK_SIZE = 64 << 10
+
+def partial_hash_file(file_path, block_size=PARTIAL_BLOCK_SIZE, algorithm="blake2b"):
+    """Hash just the first and last block of a file and return the hex digest.
+
+    A cheap pre-filter for duplicate detection: files whose sizes match but
+    whose head or tail differ can't be duplicates, so only files agreeing
+    here need a full hash. Files up to two blocks long are hashed whole.
+    """
+    hasher = hashlib.new(algorithm)
+
+    with open(file_path, 'rb', buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= 2 * block_size:
+            hasher.update(f.read())
+        else:
+            hasher.update(f.read(block_size))
+            f.seek(size - block_size)
+            hasher.update(f.read(block_size))
+
+    return hasher.hexdigest()
+
+class HashCache:
+    """Persistent SQLite cache of file hashes, keyed by (st_dev, st_ino, algorithm).
+
+    A cached hash is only returned while the file's size and mtime_ns still
+    match the stat it was hashed under - anything that rewrites the file
+    changes one of them, so unchanged files never need reading again.
+    Safe to share between threads.
+    """
+
+    # Writes are committed in batches rather than one transaction per file
+    COMMIT_EVERY = 256
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS hashes (
+                dev INTEGER NOT NULL,
+                ino INTEGER NOT NULL,
+                algorithm TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                PRIMARY KEY (dev, ino, algorithm)
+            )
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def get(self, stat_result, algorithm="blake2b", count=True):
+        """Return the cached hash for a file as stat'd, or None if it's unknown or changed since
+
+        count=False leaves the hit/miss counters alone, for lookups that
+        aren't standing in for a read (like checking a fresh hash against it).
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT hash FROM hashes WHERE dev = ? AND ino = ? AND algorithm = ? AND size = ? AND mtime_ns = ?",
+                (stat_result.st_dev, stat_result.st_ino, algorithm, stat_result.st_size, stat_result.st_mtime_ns),
+            ).fetchone()
+            if count:
+                if row is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            return None if row is None else row[0]
+
+    def put(self, stat_result, file_hash, algorithm="blake2b"):
+        """Remember the hash of a file as it was when stat'd (before hashing it)"""
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO hashes (dev, ino, algorithm, size, mtime_ns, hash) VALUES (?, ?, ?, ?, ?, ?)",
+                (stat_result.st_dev, stat_result.st_ino, algorithm, stat_result.st_size, stat_result.st_mtime_ns, file_hash),
+            )
+            self._pending += 1
+            if self._pending >= self.COMMIT_EVERY:
+                self.conn.commit()
+                self._pending = 0
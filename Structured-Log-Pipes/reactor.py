@@ -0,0 +1,113 @@
+# Async reactor for JSONL event pipes.
+#
+# Reads one JSON event per line from stdin, turns it into the registered
+# dataclass it matches and runs that type's async handler. Up to
+# `concurrency` handlers run at once, and whatever they return is written to
+# stdout as soon as they finish, so one slow event doesn't hold up the rest.
+#
+#   reactor = Reactor(concurrency=16)
+#
+#   @reactor.on(FibEvent)
+#   async def fibwait(event):
+#       await asyncio.sleep(event.a)
+#       return FibEvent(a=event.b, b=event.a + event.b)
+#
+#   reactor.run()
+
+import asyncio
+import json
+import sys
+from dataclasses import asdict, fields, is_dataclass, MISSING
+
+DEFAULT_CONCURRENCY = 16
+
+def emit(event, stream=None):
+    """Write one dataclass event to stdout as a JSON line"""
+    print(json.dumps(asdict(event)), file=stream or sys.stdout, flush=True)
+
+class Reactor:
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY):
+        self.concurrency = concurrency
+        self.handlers = {}
+
+    def on(self, event_type):
+        """Register an async handler for a dataclass event type"""
+        if not is_dataclass(event_type):
+            raise TypeError(f"{event_type!r} is not a dataclass")
+
+        def register(handler):
+            names = {f.name for f in fields(event_type)}
+            required = {f.name for f in fields(event_type)
+                        if f.default is MISSING and f.default_factory is MISSING}
+            self.handlers[event_type] = (handler, names, required)
+            return handler
+        return register
+
+    def decode(self, data):
+        """Build the event for a parsed JSON object: (handler, event), or None if nothing matches
+
+        A "type" key naming the dataclass picks it directly; otherwise the first
+        registered type whose fields fit the object's keys wins.
+        """
+        if not isinstance(data, dict):
+            return None
+        type_name = data.get("type")
+        for event_type, (handler, names, required) in self.handlers.items():
+            if type_name is not None:
+                if event_type.__name__ != type_name:
+                    continue
+                data = {k: v for k, v in data.items() if k != "type"}
+            keys = data.keys()
+            if required <= keys and keys <= names:
+                return handler, event_type(**data)
+        return None
+
+    async def _handle(self, handler, event, slots):
+        try:
+            result = await handler(event)
+            if result is None:
+                return
+            if is_dataclass(result):
+                result = (result,)
+            for output in result:
+                emit(output)
+        except Exception as e:
+            print(f"Error handling {type(event).__name__}: {e!r}", file=sys.stderr)
+        finally:
+            slots.release()
+
+    async def serve(self, stream=None):
+        """Dispatch every event on stream (stdin by default) until it closes"""
+        stream = stream or sys.stdin
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+
+        while True:
+            # Reading blocks, so do it off the loop and let running handlers progress
+            line = await asyncio.to_thread(stream.readline)
+            if not line:
+                break
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                decoded = self.decode(json.loads(line))
+            except (json.JSONDecodeError, TypeError) as e:
+                print(f"Error parsing event: {e}", file=sys.stderr)
+                continue
+            if decoded is None:
+                print(f"No handler for event: {line}", file=sys.stderr)
+                continue
+
+            # Waiting for a free slot stops reading, which backs pressure up the pipe
+            await slots.acquire()
+            task = asyncio.create_task(self._handle(*decoded, slots))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    def run(self, stream=None):
+        asyncio.run(self.serve(stream))
@@ -3,76 +3,84 @@
 # /// script
 # requires-python = ">=3.14"
 # dependencies = [
-#     "logfmt",
+#     "logfmter",
+#     "rich",
 # ]
 # ///
 
+# Turn Rich-formatted terminal output back into structured log entries.
+#
+#   ./scan_partition.py 2> captured.log
+#   ./read_logs.py < captured.log
+
 import sys
-import re
-from logfmt import parse
+from slap import parse_logfmt
 
-# Pattern to detect start of a new log entry with timestamp
-# Matches: [12/03/25 16:44:26] INFO     at=INFO...
-timestamp_pattern = re.compile(r'^\[(\d{2}/\d{2}/\d{2} \d{2}:\d{2}:\d{2})\]')
+LEVELS = frozenset(("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"))
 
-# Pattern to detect start of a new log entry without timestamp
-# Matches: "                    INFO     at=INFO..." (whitespace, log level, whitespace, then content starting with key=)
-new_entry_pattern = re.compile(r'^\s+(DEBUG|INFO|WARNING|ERROR|CRITICAL)\s+\w+=')
+def _strip_location(message):
+    """Drop the right-aligned 'file.py:NN' column Rich prints after the message"""
+    message = message.rstrip()
+    head, _, tail = message.rpartition(' ')
+    name, _, lineno = tail.rpartition(':')
+    if head and name.endswith('.py') and lineno.isdigit():
+        return head.rstrip()
+    return message
 
-def parse_multiline_logs(lines):
-    """Parse multi-line Rich-formatted logfmt entries"""
-    current_entry = None
-    current_timestamp = None
+def _starts_with_pair(text):
+    """True when text opens with a key=..., i.e. Rich wrapped at a space between pairs"""
+    key, equals, _ = text.partition('=')
+    return bool(equals) and key.isidentifier()
 
-    for line in lines:
-        # Check if this is the start of a new log entry with timestamp
-        match = timestamp_pattern.match(line)
-        is_new_entry = match or new_entry_pattern.match(line)
+def _emit(parts, timestamp):
+    entry = parse_logfmt(''.join(parts))
+    entry['timestamp'] = timestamp
+    return entry
 
-        if is_new_entry:
-            # If we have a previous entry, yield it
-            if current_entry is not None:
-                yield current_timestamp, current_entry
+def parse_multiline_logs(lines):
+    """Parse multi-line Rich-formatted logfmt entries into dicts in a single pass
 
-            # Handle entry with timestamp
-            if match:
-                current_timestamp = match.group(1)
-                rest = line[match.end():].strip()
+    Each line is either the start of an entry (optional [timestamp], level,
+    message, location) or a continuation Rich wrapped onto the next row.
+    Pieces are collected in a list and joined once per entry.
+    """
+    parts = None
+    timestamp = None
+
+    for line in lines:
+        body = line.lstrip(' ')
+        stamped = body.startswith('[')
+        if stamped:
+            close = body.find(']')
+            if close != -1:
+                new_timestamp = body[1:close]
+                body = body[close + 1:].lstrip(' ')
             else:
-                # Entry without timestamp - keep the previous timestamp
-                rest = line.strip()
+                stamped = False
 
-            # Remove the log level (INFO, DEBUG, etc.) and any extra spacing
-            rest = re.sub(r'^(DEBUG|INFO|WARNING|ERROR|CRITICAL)\s+', '', rest)
-            # Remove file location at the end (e.g., slap.py:30)
-            rest = re.sub(r'\s+\S+\.py:\d+\s*$', '', rest)
-            current_entry = rest
-        else:
-            # Continuation line
-            if current_entry is not None:
-                stripped = line.strip()
-                # Remove log level prefix if present on continuation line
-                stripped = re.sub(r'^(DEBUG|INFO|WARNING|ERROR|CRITICAL)\s+', '', stripped)
-                # Remove file location if present
-                stripped = re.sub(r'\s+\S+\.py:\d+\s*$', '', stripped)
-                # Only add non-empty content
-                if stripped:
-                    # If the line doesn't start with key=value pattern, it's a wrapped value
-                    # Don't add a space before it - just concatenate directly
-                    if re.match(r'\w+=', stripped):
-                        current_entry += ' ' + stripped
-                    else:
-                        # This is a continuation of the previous value
-                        current_entry += stripped
+        level, _, rest = body.partition(' ')
+        rest = rest.lstrip(' ')
+        if level in LEVELS and (stamped or _starts_with_pair(rest)):
+            if parts is not None:
+                yield _emit(parts, timestamp)
+            if stamped:
+                timestamp = new_timestamp
+            parts = [_strip_location(rest)]
+        elif parts is not None:
+            # Continuation row - Rich dropped the space it wrapped at, so put it
+            # back between pairs but not inside a hard-wrapped value
+            stripped = line.strip()
+            if stripped:
+                if _starts_with_pair(stripped):
+                    parts.append(' ')
+                parts.append(stripped)
 
-    # Don't forget the last entry
-    if current_entry is not None:
-        yield current_timestamp, current_entry
+    if parts is not None:
+        yield _emit(parts, timestamp)
 
-# Read and parse the logs
-for timestamp, logfmt_line in parse_multiline_logs(sys.stdin):
-    # Parse the single-line logfmt
-    for entry in parse([logfmt_line]):
-        # Add timestamp to the entry
-        entry['timestamp'] = timestamp
+def main():
+    for entry in parse_multiline_logs(sys.stdin):
         print(entry)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env -S uv run --script
+
+# /// script
+# requires-python = ">=3.14"
+# dependencies = [
+#     "logfmter",
+#     "logfmt",
+#     "rich",
+# ]
+# ///
+
+# Run scan -> stat -> hash as one concurrent pipeline, then the analysis.
+#
+# Instead of running scan_partition.py, stat_partition.py and hash_items.py
+# one after another, each stage starts on a file as soon as the stage before
+# it logs one. Work earlier runs already finished is skipped, using the logs.
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from hash_items import hash_discovery
+from scan_partition import discover_files
+from slap import Stage, flush_logging, run_pipeline, setup_logging
+from stat_partition import collect_stat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan, stat and hash a directory as one concurrent pipeline")
+    parser.add_argument("root", nargs="?", default="~/Pictures/", help="directory to scan (default: ~/Pictures/)")
+    parser.add_argument("--stat-workers", type=int, default=8, help="files to stat at once (default: 8)")
+    parser.add_argument(
+        "--hash-workers", type=int, default=os.cpu_count() or 4,
+        help="files to hash at once (default: number of CPUs)",
+    )
+    parser.add_argument("--no-scan", action="store_true", help="only finish pending work from earlier scans")
+    parser.add_argument("--analyze", action="store_true", help="run analyze_data.py once the pipeline finishes")
+    args = parser.parse_args()
+
+    setup_logging(queued=True)
+
+    root_directory = Path(args.root).expanduser().as_posix()
+
+    stages = [
+        Stage("stat", collect_stat, consumes="File Discovered", produces="File Stat Collected", workers=args.stat_workers),
+        Stage("hash", hash_discovery, consumes="File Discovered", produces="File Hash Collected", workers=args.hash_workers),
+    ]
+    if not args.no_scan:
+        stages.append(Stage("scan", lambda _: discover_files(root_directory), produces="File Discovered"))
+
+    run_pipeline(stages)
+
+    if args.analyze:
+        # analyze_data.py reads the logs directory next to the scripts
+        flush_logging()
+        script_dir = Path(__file__).resolve().parent
+        subprocess.run([sys.executable, str(script_dir / "analyze_data.py")], cwd=script_dir, check=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,15 +10,31 @@
 # ]
 # ///
 
+import argparse
 import os
 from pathlib import Path
 from slap import setup_logging, log_kw
 
-setup_logging()
 
-root_directory = Path("~/Pictures/").expanduser().as_posix()
+def discover_files(root_directory):
+    """Yield the File Discovered fields for every file under root_directory"""
+    for root, _, files in os.walk(root_directory):
+        for file in files:
+            file_path = os.path.join(root, file)
+            yield dict(entry=file_path, root=root_directory)
 
-for root, _, files in os.walk(root_directory):
-    for file in files:
-        file_path = os.path.join(root, file)
-        log_kw("File Discovered", entry=file_path, root=root_directory)
\ No newline at end of file
+def main():
+    parser = argparse.ArgumentParser(description="Discover every file under a directory")
+    parser.add_argument("root", nargs="?", default="~/Pictures/", help="directory to scan (default: ~/Pictures/)")
+    args = parser.parse_args()
+
+    setup_logging(queued=True)
+
+    root_directory = Path(args.root).expanduser().as_posix()
+
+    for discovery in discover_files(root_directory):
+        log_kw("File Discovered", **discovery)
+
+
+if __name__ == "__main__":
+    main()
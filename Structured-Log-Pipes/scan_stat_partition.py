@@ -0,0 +1,107 @@
+#!/usr/bin/env -S uv run --script
+
+# /// script
+# requires-python = ">=3.14"
+# dependencies = [
+#     "logfmter",
+#     "logfmt",
+#     "pandas",
+#     "rich",
+# ]
+# ///
+
+# scan_partition.py and stat_partition.py in a single pass.
+#
+# os.scandir hands back each file's stat alongside its name (for free on
+# Windows, one stat call on Linux), so there's no need for a second pass
+# that looks every path up again. Directories are scanned on a thread pool,
+# which keeps many stat calls in flight on high latency network mounts.
+
+import argparse
+import os
+import queue
+import threading
+from datetime import datetime
+from pathlib import Path
+from slap import setup_logging, log_kw
+
+
+def log_stat(file_path, root, stat_info):
+    """Log the same File Stat Collected event stat_partition.py does"""
+    log_kw(
+        "File Stat Collected",
+        entry=file_path,
+        root=root,
+        size_bytes=stat_info.st_size,
+        extension=Path(file_path).suffix.lower(),
+        modified=datetime.fromtimestamp(stat_info.st_mtime).isoformat(),
+        created=datetime.fromtimestamp(stat_info.st_ctime).isoformat(),
+    )
+
+def scan_directory(path, root, work):
+    """Log every file directly inside path, queueing subdirectories for other workers"""
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    # Like os.walk, a symlink to a directory counts as a
+                    # directory (so it isn't logged as a file) but isn't followed
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            work.put(entry.path)
+                        continue
+                except OSError:
+                    pass
+
+                log_kw("File Discovered", entry=entry.path, root=root)
+
+                try:
+                    log_stat(entry.path, root, entry.stat())
+                except (OSError, PermissionError) as e:
+                    log_kw("File Stat Error", err=True, entry=entry.path, error=str(e))
+    except (OSError, PermissionError) as e:
+        log_kw("Directory Scan Error", err=True, entry=path, error=str(e))
+
+def scan_worker(work, root):
+    """Scan directories off the work queue until a None sentinel arrives"""
+    while (path := work.get()) is not None:
+        try:
+            scan_directory(path, root, work)
+        finally:
+            work.task_done()
+
+def main():
+    parser = argparse.ArgumentParser(description="Discover and stat every file under a directory in one pass")
+    parser.add_argument("root", nargs="?", default="~/Pictures/", help="directory to scan (default: ~/Pictures/)")
+    parser.add_argument(
+        "--workers", type=int, default=16,
+        help="number of directories to scan at once (default: 16)",
+    )
+    args = parser.parse_args()
+
+    setup_logging(queued=True)
+
+    root_directory = Path(args.root).expanduser().as_posix()
+
+    work = queue.Queue()
+    work.put(root_directory)
+
+    workers = [
+        threading.Thread(target=scan_worker, args=(work, root_directory), daemon=True)
+        for _ in range(max(1, args.workers))
+    ]
+    for worker in workers:
+        worker.start()
+
+    # Every directory found gets queued before its parent is marked done,
+    # so join() only returns once the whole tree has been scanned
+    work.join()
+
+    for _ in workers:
+        work.put(None)
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == "__main__":
+    main()
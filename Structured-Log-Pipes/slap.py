@@ -1,16 +1,191 @@
+#!/usr/bin/env -S uv run --script
+
+# /// script
+# requires-python = ">=3.14"
+# dependencies = [
+#     "logfmter",
+#     "rich",
+# ]
+# ///
+
+import argparse
+import atexit
+import functools
+import heapq
+import io
+import json
 import logging
+import logging.handlers
+import math
+import multiprocessing
 import os
+import queue
+import re
+import sqlite3
 import sys
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
 from logfmter import Logfmter
 from rich.logging import RichHandler
-from logfmt import parse
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Most log records the background writer formats into a single write
+LOG_BATCH_SIZE = 1024
+
+class _RecordQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that passes records through untouched.
+
+    The stock prepare() formats the record on the caller's thread (and
+    flattens dict messages to strings) - exactly the work we're moving off it.
+    """
+
+    def prepare(self, record):
+        return record
+
+class _BatchWriter(threading.Thread):
+    """Background thread that drains queued log records and writes them in batches.
+
+    Stream and file handlers get each batch as one large write followed by a
+    single flush. Other handlers (like Rich) just handle records one by one.
+    """
+
+    def __init__(self, records, handlers, batch_size=LOG_BATCH_SIZE):
+        super().__init__(name="slap-log-writer", daemon=True)
+        self.records = records
+        self.handlers = handlers
+        self.batch_size = batch_size
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            flushed = []
+            record = self.records.get()
+
+            # Grab whatever else is already waiting, up to a full batch
+            while True:
+                if record is None:
+                    stopping = True
+                    break
+                if isinstance(record, threading.Event):
+                    # A flush() marker - everything queued before it is in this batch
+                    flushed.append(record)
+                else:
+                    batch.append(record)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    record = self.records.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                self.write(batch)
+            for marker in flushed:
+                marker.set()
+
+    def write(self, batch):
+        for handler in self.handlers:
+            records = [record for record in batch if record.levelno >= handler.level]
+            if not records:
+                continue
+
+            if not isinstance(handler, logging.StreamHandler):
+                for record in records:
+                    handler.handle(record)
+                continue
 
+            try:
+                text = "".join(handler.format(record) + handler.terminator for record in records)
+                with handler.lock:
+                    handler.stream.write(text)
+                    handler.flush()
+            except Exception:
+                # One bad record (e.g. a path with surrogate escapes the file
+                # encoding can't take) mustn't cost the whole batch - write
+                # them one by one so only that record is lost
+                for record in records:
+                    handler.handle(record)
+
+    def flush(self):
+        """Block until everything queued so far has been written"""
+        marker = threading.Event()
+        self.records.put(marker)
+        marker.wait()
+
+    def stop(self):
+        """Write out everything still queued, then stop the thread"""
+        self.records.put(None)
+        self.join()
+
+class JsonlFormatter(logging.Formatter):
+    """Format log records as one typed JSON object per line.
+
+    Unlike logfmt, numbers and booleans keep their types on the way back in,
+    and json.loads decodes a line far faster than any logfmt parser. Carries
+    the same fields Logfmter writes, including extra= attributes and
+    exc_info / stack_info text.
+    """
+
+    def format(self, record):
+        if isinstance(record.msg, dict):
+            params = Logfmter.flatten_dict(record.msg)
+        else:
+            params = {"msg": record.getMessage()}
+        params.update(Logfmter.get_extra(record))
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            params["exc_info"] = record.exc_text
+        if record.stack_info:
+            params["stack_info"] = self.formatStack(record.stack_info).rstrip("\n")
+
+        return json.dumps(
+            {"at": record.levelname, **params},
+            default=str,
+            ensure_ascii=False,
+            separators=(',', ':'),
+        )
+
+# The background writer started by setup_logging(queued=True), if any
+_log_writer = None
+
+def flush_logging():
+    """Make sure every event logged so far is written out, e.g. before another process reads the logs"""
+    if _log_writer is not None:
+        _log_writer.flush()
+    for handler in logging.getLogger().handlers:
+        handler.flush()
+
+# Log file format(s) setup_logging can write to the logs directory
+LOG_FORMATS = ("logfmt", "jsonl", "both")
+
+def setup_logging(level=logging.DEBUG, queued=False, log_format="logfmt"):
+    """Setup structured logging with Logfmter for machine-readable output
+
+    With queued=True, logging calls only put the record on a queue - a
+    background thread formats and writes them in batches, and flushes
+    whatever is left when the program exits.
+
+    log_format picks what goes to the logs directory: "logfmt" (.log),
+    "jsonl" (.jsonl, typed values) or "both". stdout is always logfmt.
+    """
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"log_format must be one of {LOG_FORMATS}, not {log_format!r}")
 
-def setup_logging(level=logging.DEBUG):
-    """Setup structured logging with Logfmter for machine-readable output"""
     log_formatter = Logfmter()
 
     handlers = []
@@ -49,13 +224,29 @@ def setup_logging(level=logging.DEBUG):
     # Generate log filename with PID, datetime, and script name
     pid = os.getpid()
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_filename = f"{pid}_{timestamp}_{script_name}.log"
-    log_filepath = logs_dir / log_filename
+    log_filename = f"{pid}_{timestamp}_{script_name}"
+
+    file_formatters = []
+    if log_format in ("logfmt", "both"):
+        file_formatters.append((".log", log_formatter))
+    if log_format in ("jsonl", "both"):
+        file_formatters.append((".jsonl", JsonlFormatter()))
+
+    for suffix, formatter in file_formatters:
+        file_handler = logging.FileHandler(logs_dir / (log_filename + suffix))
+        file_handler.setLevel(level)
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
 
-    file_handler = logging.FileHandler(log_filepath)
-    file_handler.setLevel(level)
-    file_handler.setFormatter(log_formatter)
-    handlers.append(file_handler)
+    if queued:
+        records = queue.SimpleQueue()
+        writer = _BatchWriter(records, handlers)
+        writer.start()
+        # atexit runs in reverse, so this flushes before logging shuts the handlers down
+        atexit.register(writer.stop)
+        global _log_writer
+        _log_writer = writer
+        handlers = [_RecordQueueHandler(records)]
 
     logging.basicConfig(
         level=level,
@@ -81,86 +272,1215 @@ def log_kw(msg, err=False, **kwargs):
             **kwargs
         })
 
-def read_logs_from_stdin():
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted, non-empty list"""
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+# Latency histogram buckets are 2**(1/8) apart, so a percentile read off a
+# merged histogram is within about 9% of the exact one
+LATENCY_BUCKETS_PER_DOUBLING = 8
+
+def latency_histogram(latencies_ms):
+    """Count latencies into log-spaced buckets, returning {bucket: count}"""
+    histogram = defaultdict(int)
+    for latency in latencies_ms:
+        # Anything under a microsecond shares the lowest bucket
+        histogram[math.ceil(math.log2(max(latency, 0.001)) * LATENCY_BUCKETS_PER_DOUBLING)] += 1
+    return dict(histogram)
+
+def format_histogram(histogram):
+    """Write a latency histogram as a compact "bucket:count,..." log value"""
+    return ",".join(f"{bucket}:{count}" for bucket, count in sorted(histogram.items()))
+
+def parse_histogram(value):
+    """Read back a format_histogram() value as {bucket: count}"""
+    histogram = {}
+    for pair in str(value).split(","):
+        bucket, _, count = pair.partition(":")
+        histogram[int(bucket)] = int(count)
+    return histogram
+
+def histogram_percentile(histogram, pct):
+    """Nearest-rank percentile of a non-empty latency histogram, as the upper bound of its bucket in ms.
+
+    Histograms of several runs can be summed bucket by bucket first, which
+    gives the percentile over all of their items.
+    """
+    rank = max(1, math.ceil(pct / 100 * sum(histogram.values())))
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= rank:
+            return 2 ** (bucket / LATENCY_BUCKETS_PER_DOUBLING)
+
+def _peak_rss_mb():
+    """Peak resident memory of this process so far, or None where it can't be read"""
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20, 1)
+
+class _StageItem:
+    """Handed out by StageMetrics.item() - set .bytes to how much data the item covered"""
+    __slots__ = ("bytes",)
+
+    def __init__(self):
+        self.bytes = 0
+
+class StageMetrics:
+    """Measure one run of a pipeline stage and log it as a "Stage Completed" event.
+
+    Wrap the stage in ``with StageMetrics("hash") as stage:`` and each unit of
+    work in ``with stage.item(entry) as item:`` (or decorate the function doing
+    it with ``stage.track``). On exit the stage logs wall and CPU time, item
+    and byte counts, throughput, item latency percentiles and peak RSS. The
+    latencies are also logged as a latency_histogram that can be merged with
+    other runs' to get percentiles across them.
+
+    item_events=True also logs a "Stage Item Completed" event per item. Off
+    by default - the latencies never repeat, so every run would add one
+    event per item to the logs for good, and to the output of a piped stage.
+
+    item() is safe to use from several worker threads at once.
+    """
+
+    def __init__(self, stage, item_events=False):
+        self.stage = stage
+        self.item_events = item_events
+        self.items = 0
+        self.bytes = 0
+        self.latencies_ms = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._start
+        cpu = time.process_time() - self._cpu_start
+
+        fields = dict(
+            stage=self.stage,
+            duration_ms=round(duration * 1000, 3),
+            cpu_ms=round(cpu * 1000, 3),
+            items=self.items,
+            bytes=self.bytes,
+            items_per_sec=round(self.items / duration, 1) if duration else 0,
+            bytes_per_sec=round(self.bytes / duration) if duration else 0,
+        )
+        if self.latencies_ms:
+            latencies = sorted(self.latencies_ms)
+            for pct in (50, 95, 99):
+                fields[f"p{pct}_ms"] = round(percentile(latencies, pct), 3)
+            fields["latency_histogram"] = format_histogram(latency_histogram(latencies))
+        if (peak_rss_mb := _peak_rss_mb()) is not None:
+            fields["peak_rss_mb"] = peak_rss_mb
+
+        if exc_type is not None:
+            log_kw("Stage Completed", err=True, error=str(exc), **fields)
+        else:
+            log_kw("Stage Completed", **fields)
+        return False
+
+    @contextmanager
+    def item(self, entry=None):
+        """Time one unit of work, e.g. one file"""
+        item = _StageItem()
+        start = time.perf_counter()
+        try:
+            yield item
+        finally:
+            self.record(entry, (time.perf_counter() - start) * 1000, item.bytes)
+
+    def record(self, entry, latency_ms, nbytes=0):
+        """Count an item timed elsewhere, e.g. in a worker process"""
+        with self._lock:
+            self.items += 1
+            self.bytes += nbytes
+            self.latencies_ms.append(latency_ms)
+        if self.item_events:
+            log_kw(
+                "Stage Item Completed",
+                stage=self.stage,
+                entry=entry,
+                duration_ms=round(latency_ms, 3),
+                bytes=nbytes,
+            )
+
+    def track(self, fn):
+        """Decorator timing each call of fn as an item, named by the 'entry' of its first argument"""
+        @functools.wraps(fn)
+        def tracked(event, *args, **kwargs):
+            with self.item(event.get('entry')):
+                return fn(event, *args, **kwargs)
+        return tracked
+
+# One key=value pair as written by Logfmter: values are either bare tokens or
+# double-quoted strings with backslash escapes. A key with no '=' is a flag.
+# Pairs are split on ASCII spaces only - Logfmter leaves values with other
+# whitespace (NBSP, U+3000, ...) unquoted, so they're part of the token.
+_LOGFMT_PAIR = re.compile(r'([^ ="]+)(?:(=)("(?:[^"\\]|\\.)*"?|[^ "]*))?')
+_LOGFMT_ESCAPE = re.compile(r'\\(u[0-9a-fA-F]{4}|.)')
+_LOGFMT_UNESCAPES = {'n': '\n', 't': '\t', 'r': '\r'}
+
+def _unescape_logfmt(match):
+    escaped = match.group(1)
+    if len(escaped) == 5:
+        return chr(int(escaped[1:], 16))
+    return _LOGFMT_UNESCAPES.get(escaped, escaped)
+
+def parse_logfmt(line):
+    """Parse a single logfmt line into a dict.
+
+    Understands the quoting rules Logfmter writes: values containing spaces,
+    '=', quotes or control characters are double-quoted, with backslash
+    escapes inside the quotes. Empty values (``key=``) parse as "" and bare
+    keys parse as True.
+    """
+    # Fast path - lines without quotes are just space separated pairs
+    if '"' not in line:
+        parsed = {}
+        for token in line.split(' '):
+            if not token:
+                continue
+            key, sep, value = token.partition('=')
+            parsed[key] = value if sep else True
+        return parsed
+
+    parsed = {}
+    for key, equals, value in _LOGFMT_PAIR.findall(line):
+        if not equals:
+            value = True
+        elif value.startswith('"'):
+            value = value[1:-1] if len(value) > 1 and value.endswith('"') else value[1:]
+            if '\\' in value:
+                value = _LOGFMT_ESCAPE.sub(_unescape_logfmt, value)
+        parsed[key] = value
+    return parsed
+
+def parse_logfmt_buffer(text):
+    """Parse a whole buffer of logfmt lines at once, yielding one dict per non-empty line.
+
+    Only bench_logfmt.py uses this, to measure parsing without per-line I/O -
+    the readers go through parse_logfmt() a line at a time.
+    """
+    # Not splitlines() - Logfmter leaves \x85, U+2028 and friends unescaped inside values
+    for line in text.split('\n'):
+        if line := line.rstrip('\r'):
+            yield parse_logfmt(line)
+
+def _event_from_parsed(parsed):
+    """Split a parsed logfmt dict into (msg, event_data), or None if it has no msg"""
+    msg = parsed.pop('msg', None)
+    if msg is None:
+        return None
+    # Remove 'at' from the data, keep rest
+    parsed.pop('at', None)
+    return msg, parsed
+
+def _parse_json_line(line):
+    """Parse one JSONL log line into a flat dict, or None if it isn't a JSON object"""
+    try:
+        parsed = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(parsed, dict):
+        return None
+
+    # Events are deduplicated by hashing their values, so keep them hashable
+    for key, value in parsed.items():
+        if isinstance(value, (list, dict)):
+            parsed[key] = json.dumps(value, sort_keys=True)
+    return parsed
+
+def _parse_event(line):
+    """Parse one logfmt or JSONL line into (msg, event_data), or None if it has no msg"""
+    # ASCII whitespace only - a value can end in an unquoted NBSP or U+3000
+    line = line.strip(' \t\r\n')
+    if not line:
+        return None
+    if line.startswith('{'):
+        parsed = _parse_json_line(line)
+        return None if parsed is None else _event_from_parsed(parsed)
+    return _event_from_parsed(parse_logfmt(line))
+
+def iter_unique_events(lines):
+    """Yield deduplicated (msg, event_data) pairs from logfmt or JSONL lines as they are parsed.
+
+    Instead of holding every distinct event in memory, only a 64-bit
+    fingerprint of each event (msg plus its unordered key/value pairs) is
+    remembered - a few dozen bytes per event rather than the whole event.
+    """
+    seen = set()
+
+    for line in lines:
+        event = _parse_event(line)
+        if event is None:
+            continue
+
+        msg, event_data = event
+        fingerprint = hash((msg, frozenset(event_data.items())))
+        if fingerprint in seen:
+            continue
+        seen.add(fingerprint)
+
+        yield msg, event_data
+
+def _log_files(logs_path):
+    """Return the log files in a logs directory, sorted by name (which includes timestamp).
+
+    Both .log and .jsonl files are read. When a run wrote both formats, or
+    a .log was converted, only the .jsonl copy is used.
+    """
+    by_stem = {log_file.stem: log_file for log_file in logs_path.glob("*.log")}
+    by_stem.update((log_file.stem, log_file) for log_file in logs_path.glob("*.jsonl"))
+    return sorted(by_stem.values())
+
+# Compacted segments and their manifest live in a subdirectory of logs/,
+# out of the way of the *.log / *.jsonl globs
+COMPACTED_DIR = "compacted"
+MANIFEST_NAME = "manifest.json"
+
+def _load_manifest(logs_path):
+    """Return the compaction manifest for a logs directory, or an empty one"""
+    manifest_path = logs_path / COMPACTED_DIR / MANIFEST_NAME
+    if not manifest_path.exists():
+        return {"segments": [], "sources": {}}
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+def _save_manifest(logs_path, manifest):
+    """Swap a new compaction manifest in atomically - until it lands, readers keep using the old one"""
+    manifest_path = logs_path / COMPACTED_DIR / MANIFEST_NAME
+    tmp_manifest = manifest_path.with_suffix(".json.tmp")
+    with open(tmp_manifest, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_manifest, manifest_path)
+
+def _log_sources(logs_path):
+    """Return (file, byte offset) pairs covering every event in a logs directory.
+
+    Compacted segments come first, then whatever each raw log file gained
+    after the last compaction - raw data that was already compacted is
+    never read again.
+    """
+    manifest = _load_manifest(logs_path)
+    sources = [(logs_path / COMPACTED_DIR / segment, 0) for segment in manifest["segments"]]
+
+    for log_file in _log_files(logs_path):
+        offset = manifest["sources"].get(log_file.name, 0)
+        size = log_file.stat().st_size
+        # Smaller than when it was compacted - truncated or replaced, read it all
+        if size < offset:
+            offset = 0
+        if size > offset:
+            sources.append((log_file, offset))
+
+    return sources
+
+# How much text to pull from a log file per read when scanning whole files
+READ_BATCH_BYTES = 1 << 20
+
+def _iter_log_file_lines(sources):
+    """Yield every line of the given (file, byte offset) sources, one file after another"""
+    for log_file, offset in sources:
+        with open(log_file, 'rb') as raw:
+            raw.seek(offset)
+            f = io.TextIOWrapper(raw, encoding='utf-8', errors='replace')
+            # Read in large batches rather than line by line
+            while batch := f.readlines(READ_BATCH_BYTES):
+                yield from batch
+
+def iter_logs(logs_dir="logs"):
+    """Stream deduplicated (msg, event_data) pairs from stdin if piped, otherwise from log files.
+
+    The streaming counterpart of read_logs() - downstream work can start on
+    the first event, and peak memory doesn't grow with the size of the logs.
+    """
+    if not sys.stdin.isatty():
+        return iter_unique_events(sys.stdin)
+
+    logs_path = Path(logs_dir)
+    if not logs_path.exists():
+        return iter(())
+
+    return iter_unique_events(_iter_log_file_lines(_log_sources(logs_path)))
+
+class Record(tuple):
+    """A compact, read-only event - a tuple of values that reads like a dict.
+
+    Events of the same shape share one subclass (see record_class) holding
+    the field names, so each record costs a tuple of pointers instead of a
+    dict with its own copy of every key. ``event['entry']``, ``.get()``,
+    ``in``, iteration over keys, ``.keys()/.values()/.items()`` and
+    ``dict(event)`` all work as they do on the dicts read_logs() normally
+    returns; assignment doesn't.
+    """
+    __slots__ = ()
+    _fields = ()
+    _index = {}
+
+    def __getitem__(self, key):
+        return tuple.__getitem__(self, self._index[key])
+
+    def get(self, key, default=None):
+        i = self._index.get(key)
+        return default if i is None else tuple.__getitem__(self, i)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def keys(self):
+        return self._fields
+
+    def values(self):
+        return tuple(tuple.__iter__(self))
+
+    def items(self):
+        return zip(self._fields, tuple.__iter__(self))
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+_record_classes = {}
+
+def record_class(fields):
+    """Return the Record subclass for events with exactly these fields, in this order"""
+    cls = _record_classes.get(fields)
+    if cls is None:
+        cls = type("Record", (Record,), {
+            "__slots__": (),
+            "_fields": fields,
+            "_index": {name: i for i, name in enumerate(fields)},
+        })
+        _record_classes[fields] = cls
+    return cls
+
+def _group_by_msg(events, compact=False):
+    """Collect (msg, event_data) pairs into the msg -> list of dicts shape of read_logs().
+
+    With compact=True each event is stored as a Record instead, and equal
+    string values (like a shared root or algorithm) are interned so every
+    record points at one copy.
+    """
+    events_by_msg = defaultdict(list)
+    if not compact:
+        for msg, event_data in events:
+            events_by_msg[msg].append(event_data)
+        return dict(events_by_msg)
+
+    # Local intern table - unlike sys.intern, it's freed once loading is done
+    strings = {}
+    intern = strings.setdefault
+    for msg, event_data in events:
+        # Field names live once, on the class
+        cls = record_class(tuple(event_data))
+        events_by_msg[msg].append(cls([
+            intern(value, value) if type(value) is str else value
+            for value in event_data.values()
+        ]))
+    return dict(events_by_msg)
+
+def read_logs_from_stdin(compact=False):
     """Read logfmt from stdin and organize deduplicated events by msg.
 
     Returns:
         dict: A dictionary where keys are msg values and values are lists of
               dicts containing the other key-value pairs from each log entry.
     """
-    # Dictionary to hold msg -> set of event data (using set for deduplication)
-    events_by_msg = defaultdict(set)
+    return _group_by_msg(iter_unique_events(sys.stdin), compact)
 
-    for line in sys.stdin:
-        line = line.strip()
-        if not line:
-            continue
 
-        # Parse the logfmt line (parse expects a list of lines)
-        for parsed in parse([line]):
-            parsed = dict(parsed)
-
-            # Extract msg and create frozenset of other properties
-            if 'msg' in parsed:
-                msg = parsed['msg']
-                # Remove 'at' and 'msg' from the data, keep rest
-                event_data = {k: v for k, v in parsed.items() if k not in ('at', 'msg')}
-                # Convert to frozenset for hashing/deduplication
-                event_frozenset = frozenset(event_data.items())
-                events_by_msg[msg].add(event_frozenset)
-
-    # Convert sets of frozensets to lists of dicts
-    return {
-        msg: [dict(event_frozenset) for event_frozenset in events]
-        for msg, events in events_by_msg.items()
-    }
-
-def read_logs(logs_dir="logs"):
+def _event_json(event_data):
+    """Canonical JSON for an event's data - equal events give equal strings, whatever their key order"""
+    return json.dumps(event_data, sort_keys=True, separators=(',', ':'))
+
+def _read_log_file(log_file, offset=0):
+    """Parse the complete lines of one log file, starting from a byte offset.
+
+    Events come back as canonical JSON strings, deduplicated on the string,
+    with their entry alongside for the index. Strings are much cheaper to
+    pickle back from a worker process and to merge than parsed events.
+
+    Returns:
+        tuple: (offset just past the last complete line, number of lines read,
+                dict of msg -> {event JSON: entry})
+    """
+    events_by_msg = defaultdict(dict)
+    lines_read = 0
+    # A repeated line is the same event, no need to parse it again
+    seen_lines = set()
+
+    with open(log_file, 'rb') as f:
+        f.seek(offset)
+        for raw_line in f:
+            # Stop at a partial trailing line - a writer may still be
+            # in the middle of it, we'll pick it up next time
+            if not raw_line.endswith(b"\n"):
+                break
+            offset += len(raw_line)
+            lines_read += 1
+
+            if raw_line in seen_lines:
+                continue
+            seen_lines.add(raw_line)
+
+            event = _parse_event(raw_line.decode('utf-8', errors='replace'))
+            if event is not None:
+                msg, event_data = event
+                events_by_msg[msg][_event_json(event_data)] = event_data.get('entry')
+
+    return offset, lines_read, dict(events_by_msg)
+
+def _read_log_files(jobs, workers=1):
+    """Yield _read_log_file results for (log_file, offset) jobs, in job order.
+
+    With workers > 1 the files are parsed in a pool of processes - each
+    PID-stamped log file is independent, so this scales with the number of
+    files up to the number of cores.
+    """
+    if workers <= 1 or len(jobs) <= 1:
+        for log_file, offset in jobs:
+            yield _read_log_file(log_file, offset)
+        return
+
+    # Pipeline scripts do their work at module level, so a spawned worker
+    # re-importing __main__ would rerun the whole script - fork instead
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = None
+
+    log_files, offsets = zip(*jobs)
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=context) as pool:
+        yield from pool.map(_read_log_file, log_files, offsets)
+
+
+class LogIndex:
+    """Persistent, incrementally-updated SQLite index of the events in a logs directory.
+
+    The index lives next to the logs directory (``logs`` -> ``logs.index.sqlite``)
+    and remembers how many bytes of each log file it has already ingested, so
+    ``update()`` only parses lines appended since the last run.
+
+    Events are stored deduplicated by (msg, event data), with the ``entry``
+    field pulled out into its own indexed column for key lookups.
+    """
+
+    # Bump whenever the way events are parsed or stored changes
+    VERSION = 3
+
+    def __init__(self, logs_dir="logs", index_path=None):
+        self.logs_path = Path(logs_dir)
+        if index_path is None:
+            resolved = self.logs_path.resolve()
+            index_path = resolved.with_name(resolved.name + ".index.sqlite")
+        self.index_path = Path(index_path)
+
+        # Several pipeline scripts may open the index at once - WAL plus a
+        # generous busy timeout lets them take turns instead of failing
+        self.conn = sqlite3.connect(self.index_path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+
+        # Rebuild from scratch when the stored events came from an older parser
+        (version,) = self.conn.execute("PRAGMA user_version").fetchone()
+        if version != self.VERSION:
+            self._reset()
+        else:
+            self._create_tables()
+
+    def _reset(self):
+        """Throw away everything indexed so far"""
+        self.conn.executescript(f"""
+            DROP TABLE IF EXISTS files;
+            DROP TABLE IF EXISTS events;
+            PRAGMA user_version = {self.VERSION};
+        """)
+        self._create_tables()
+
+    def _create_tables(self):
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                offset INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS events (
+                msg TEXT NOT NULL,
+                entry TEXT,
+                data TEXT NOT NULL,
+                UNIQUE (msg, data)
+            );
+            CREATE INDEX IF NOT EXISTS events_msg_entry ON events (msg, entry);
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def update(self, workers=1):
+        """Ingest any lines appended to the log files since the last update.
+
+        Args:
+            workers: Number of processes used to parse the new lines of
+                     different log files in parallel.
+
+        Returns:
+            int: The number of new lines read.
+        """
+        if not self.logs_path.exists():
+            return 0
+
+        sources = _log_sources(self.logs_path)
+        offsets = dict(self.conn.execute("SELECT path, offset FROM files"))
+
+        # Files are tracked by their path relative to the logs directory
+        existing = {
+            str(log_file.relative_to(self.logs_path))
+            for log_file in [*_log_files(self.logs_path), *(log_file for log_file, _ in sources)]
+        }
+
+        # A file we indexed is gone (deleted, merged away by compaction or
+        # shadowed by a converted .jsonl) - its events can't be picked out
+        # again, so start over
+        if not offsets.keys() <= existing:
+            self._reset()
+            offsets = {}
+
+        jobs = []
+        for log_file, start in sources:
+            size = log_file.stat().st_size
+            offset = offsets.get(str(log_file.relative_to(self.logs_path)), 0)
+
+            # A file smaller than what we've already read was truncated or
+            # replaced - start over, the unique constraint drops repeats
+            if size < offset:
+                offset = 0
+            # Anything before start is already in a compacted segment
+            offset = max(offset, start)
+            if size > offset:
+                jobs.append((log_file, offset))
+
+        lines_read = 0
+        for (log_file, _), (offset, file_lines, events_by_msg) in zip(jobs, _read_log_files(jobs, workers)):
+            lines_read += file_lines
+            # Already in the shape of the table - the worker did the JSON
+            rows = [
+                (msg, entry, data)
+                for msg, events in events_by_msg.items()
+                for data, entry in events.items()
+            ]
+
+            # Events and the new offset commit together, so an interrupted
+            # update never skips lines
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO events (msg, entry, data) VALUES (?, ?, ?)",
+                    rows,
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO files (path, offset) VALUES (?, ?)",
+                    (str(log_file.relative_to(self.logs_path)), offset),
+                )
+
+        return lines_read
+
+    def events(self, msg):
+        """Return the deduplicated events for one msg as a list of dicts"""
+        return [
+            json.loads(data)
+            for (data,) in self.conn.execute("SELECT data FROM events WHERE msg = ?", (msg,))
+        ]
+
+    def keys(self, msg, key='entry'):
+        """Return the set of `key` values seen on `msg` events, like processed_keys()"""
+        if key == 'entry':
+            # Straight off the (msg, entry) index, no JSON decoding
+            rows = self.conn.execute("SELECT DISTINCT entry FROM events WHERE msg = ? AND entry IS NOT NULL", (msg,))
+            return {entry for (entry,) in rows}
+        return {event[key] for event in self.events(msg) if key in event}
+
+    def snapshot(self, compact=False):
+        """Return every indexed event, organized by msg like read_logs()"""
+        rows = self.conn.execute("SELECT msg, data FROM events")
+        return _group_by_msg(((msg, json.loads(data)) for msg, data in rows), compact)
+
+def read_logs(logs_dir="logs", use_index=True, workers=1, compact=False):
     """Read logfmt logs from stdin if piped, otherwise from log files.
 
     Automatically detects if data is being piped via stdin and switches modes.
 
+    When reading from log files, events are served from a persistent LogIndex
+    next to the logs directory, so only lines written since the last call are
+    parsed. Pass use_index=False to reparse every file from scratch.
+
+    With workers > 1, log files are parsed in parallel across that many
+    processes, and the partial results are merged with deduplication.
+
+    If the logs have been compacted (see compact_logs), the segments are
+    read in place of the raw lines they cover.
+
+    With compact=True events come back as read-only Records instead of
+    dicts, which takes several times less memory on large snapshots.
+
     Returns:
         dict: A dictionary where keys are msg values and values are lists of
               dicts containing the other key-value pairs from each log entry.
     """
     # Check if stdin is being piped
     if not sys.stdin.isatty():
-        return read_logs_from_stdin()
+        return read_logs_from_stdin(compact)
 
     # Otherwise, read from log files
     logs_path = Path(logs_dir)
     if not logs_path.exists():
         return {}
 
-    # Get all .log files sorted by name (which includes timestamp)
-    log_files = sorted(logs_path.glob("*.log"))
-
-    # Dictionary to hold msg -> set of event data (using set for deduplication)
-    events_by_msg = defaultdict(set)
-
-    for log_file in log_files:
-        with open(log_file, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-
-                # Parse the logfmt line (parse expects a list of lines)
-                for parsed in parse([line]):
-                    parsed = dict(parsed)
-
-                    # Extract msg and create frozenset of other properties
-                    if 'msg' in parsed:
-                        msg = parsed['msg']
-                        # Remove 'at' and 'msg' from the data, keep rest
-                        event_data = {k: v for k, v in parsed.items() if k not in ('at', 'msg')}
-                        # Convert to frozenset for hashing/deduplication
-                        event_frozenset = frozenset(event_data.items())
-                        events_by_msg[msg].add(event_frozenset)
-
-    # Convert sets of frozensets to lists of dicts
-    return {
-        msg: [dict(event_frozenset) for event_frozenset in events]
-        for msg, events in events_by_msg.items()
-    }
\ No newline at end of file
+    if use_index:
+        with LogIndex(logs_path) as index:
+            index.update(workers=workers)
+            return index.snapshot(compact)
+
+    if workers <= 1:
+        return _group_by_msg(iter_logs(logs_path), compact)
+    return _read_logs_parallel(logs_path, workers, compact)
+
+def _read_logs_parallel(logs_path, workers, compact=False):
+    """read_logs() without the index, parsing the log files across `workers` processes"""
+    # Merge each worker's partial msg -> events map, duplicates collapse on the JSON string
+    events_by_msg = defaultdict(dict)
+    for _, _, file_events in _read_log_files(_log_sources(logs_path), workers):
+        for msg, events in file_events.items():
+            events_by_msg[msg].update(events)
+
+    # Only the unique events are decoded into dicts (or Records) - as one
+    # JSON array per msg, which is several times faster than a call per event
+    return _group_by_msg(
+        (
+            (msg, event_data)
+            for msg, events in events_by_msg.items()
+            for event_data in json.loads("[" + ",".join(events) + "]")
+        ),
+        compact,
+    )
+
+def processed_keys(log_snapshot, msg, key='entry'):
+    """Return the set of `key` values seen on `msg` events, for O(1) membership checks.
+
+    Example:
+        hashed = processed_keys(log_snapshot, 'File Hash Collected')
+        if file_path in hashed: ...
+    """
+    return {event[key] for event in log_snapshot.get(msg, []) if key in event}
+
+def _done_keys(done_events, key, require):
+    """The keys of done_events that count as done - every key, or with require=(field, values) only keys seen with all the values"""
+    if require is None:
+        return {event[key] for event in done_events if key in event}
+
+    field, values = require
+    seen = defaultdict(set)
+    for event in done_events:
+        if key in event and event.get(field) in values:
+            seen[event[key]].add(event[field])
+    return {k for k, found in seen.items() if found >= values}
+
+def pending(log_snapshot, source_msg, done_msg, key='entry', require=None):
+    """Return the `source_msg` events whose `key` has no matching `done_msg` event yet.
+
+    This is the usual way for a pipeline step to skip work a previous run
+    already finished - the done keys are hashed once, so the whole check is
+    linear in the number of events instead of quadratic.
+
+    require=(field, values) asks for a `done_msg` event with each of the
+    values before a key counts as done, e.g. ('algorithm', {'blake2b', 'sha256'})
+    keeps a file pending until it has both digests.
+    """
+    if require is not None:
+        require = (require[0], set(require[1]))
+    done = _done_keys(log_snapshot.get(done_msg, []), key, require)
+    return [
+        event for event in log_snapshot.get(source_msg, [])
+        if event.get(key) not in done
+    ]
+
+def _msg_needles(msgs):
+    """Return substrings at least one of which must appear in any logfmt or JSONL line for these msgs"""
+    needles = set()
+    for msg in msgs:
+        needles.add("msg=" + Logfmter.format_value(msg))
+        needles.add(json.dumps(msg))
+        needles.add(json.dumps(msg, ensure_ascii=False))
+    return tuple(needles)
+
+def iter_query(msg, fields=None, where=None, logs_dir="logs"):
+    """Stream deduplicated (msg, event_data) pairs for only the given msg(s), from stdin if piped or the log files.
+
+    Lines that can't contain a wanted msg are skipped with a substring check
+    before any parsing, so a consumer of a couple of event types doesn't pay
+    to parse all the others.
+
+    Args:
+        msg: A msg, or a collection of them.
+        fields: If given, only these keys are kept on each event (and
+                events are deduplicated on just those keys).
+        where: A dict of field -> value every event must match, or a
+               predicate called with the full event data.
+    """
+    if not sys.stdin.isatty():
+        lines = sys.stdin
+    else:
+        logs_path = Path(logs_dir)
+        if not logs_path.exists():
+            return
+        lines = _iter_log_file_lines(_log_sources(logs_path))
+
+    yield from _query_lines(lines, msg, fields, where)
+
+def _query_lines(lines, msg, fields=None, where=None):
+    """The filtering behind iter_query(), over any iterable of log lines"""
+    msgs = {msg} if isinstance(msg, str) else set(msg)
+    needles = _msg_needles(msgs)
+    if isinstance(where, dict):
+        conditions = where.items()
+        where = lambda event: all(event.get(k) == v for k, v in conditions)
+
+    seen = set()
+    for line in lines:
+        if not any(needle in line for needle in needles):
+            continue
+        event = _parse_event(line)
+        # The prefilter can let through e.g. a msg that is a prefix of another
+        if event is None or event[0] not in msgs:
+            continue
+
+        event_msg, event_data = event
+        if where is not None and not where(event_data):
+            continue
+        if fields is not None:
+            event_data = {k: event_data[k] for k in fields if k in event_data}
+
+        fingerprint = hash((event_msg, frozenset(event_data.items())))
+        if fingerprint in seen:
+            continue
+        seen.add(fingerprint)
+
+        yield event_msg, event_data
+
+def query(msg, fields=None, where=None, logs_dir="logs", compact=False):
+    """Read just the events a step needs, organized by msg like read_logs().
+
+    Example:
+        log_snapshot = query(['File Discovered', 'File Hash Collected'], fields=['entry', 'hash'])
+        todo = pending(log_snapshot, 'File Discovered', 'File Hash Collected')
+
+    See iter_query() for the other arguments, and read_logs() for compact.
+    """
+    return _group_by_msg(iter_query(msg, fields, where, logs_dir), compact)
+
+def iter_pending(source_msg, done_msg, key='entry', logs_dir="logs", require=None):
+    """Yield the `source_msg` events that still need doing, streaming them when stdin is piped.
+
+    When piped, events are yielded as their lines arrive, so a downstream
+    stage works alongside the upstream one instead of waiting for it to
+    finish. Keys are skipped if the log files already have a `done_msg` for
+    them, or one went past earlier in the stream. Backpressure comes for
+    free - while the caller is busy nothing more is read, the pipe fills up
+    and the upstream process blocks on its writes.
+
+    Otherwise this is pending() over the LogIndex, decoding only the two msgs
+    involved rather than every event in the logs. See pending() for require.
+    """
+    if require is not None:
+        field, values = require[0], set(require[1])
+        require = (field, values)
+
+    piped = not sys.stdin.isatty()
+    done = set()
+    source_events = []
+    if Path(logs_dir).exists():
+        with LogIndex(logs_dir) as index:
+            index.update()
+            if require is None:
+                done = index.keys(done_msg, key)
+            else:
+                done = _done_keys(index.events(done_msg), key, require)
+            if not piped:
+                source_events = index.events(source_msg)
+
+    if not piped:
+        for event in source_events:
+            if event.get(key) not in done:
+                yield event
+        return
+
+    # With require, the values seen so far for keys that aren't done yet
+    partial = defaultdict(set)
+
+    for msg, event in iter_unique_events(sys.stdin):
+        if key not in event:
+            continue
+        if msg == done_msg:
+            if require is None:
+                done.add(event[key])
+            elif event.get(field) in values:
+                found = partial[event[key]]
+                found.add(event[field])
+                if found >= values:
+                    done.add(event[key])
+                    del partial[event[key]]
+        elif msg == source_msg and event[key] not in done:
+            # Only once per key, even if the source event shows up again
+            done.add(event[key])
+            yield event
+
+@dataclass
+class Stage:
+    """One step of a pipeline run by run_pipeline(), declared by the events it consumes and produces.
+
+    work is called with each `consumes` event (or once with None for a
+    source stage with no `consumes`) and returns the fields of the
+    `produces` event(s) to log - a dict, an iterable of dicts, or None when
+    there's nothing to log (e.g. it logged its own error event).
+    """
+    name: str
+    work: Callable
+    produces: str
+    consumes: str | None = None
+    key: str = 'entry'
+    workers: int = 1
+
+@dataclass
+class _StageState:
+    stage: Stage
+    work: queue.Queue = field(default_factory=queue.Queue)
+    # Keys already produced or already queued, so nothing runs twice
+    seen: set = field(default_factory=set)
+    downstream: list = field(default_factory=list)
+    upstream_running: int = 0
+    workers: int = 1
+    workers_running: int = 0
+
+# Queued once for a source stage in place of an event
+_SOURCE = object()
+
+def run_pipeline(stages, log_snapshot=None):
+    """Run stages concurrently as a DAG wired together by event msg.
+
+    Pending work for each stage is computed from the log facts - `consumes`
+    events whose key has no `produces` event yet - and every event a stage
+    produces is handed straight to the stages consuming it, so downstream
+    work starts as soon as the first upstream event appears. Each stage
+    runs on its own pool of `workers` threads, and a stage finishes once
+    everything upstream of it has finished and its queue is drained.
+    """
+    if log_snapshot is None:
+        log_snapshot = read_logs()
+
+    states = {stage.name: _StageState(stage) for stage in stages}
+    lock = threading.Lock()
+
+    for state in states.values():
+        state.seen = processed_keys(log_snapshot, state.stage.produces, state.stage.key)
+        for other in states.values():
+            if other.stage.consumes is not None and other.stage.consumes == state.stage.produces:
+                state.downstream.append(other)
+                other.upstream_running += 1
+
+    def enqueue(state, event):
+        """Queue an event for a stage unless its key was already done or queued"""
+        key = event.get(state.stage.key)
+        with lock:
+            if key in state.seen:
+                return
+            state.seen.add(key)
+        state.work.put(event)
+
+    def close(state):
+        """No more input is coming - wake every worker of this stage to exit"""
+        for _ in range(state.workers):
+            state.work.put(None)
+
+    def run_worker(state):
+        stage = state.stage
+        try:
+            while (item := state.work.get()) is not None:
+                event = None if item is _SOURCE else item
+                try:
+                    results = stage.work(event)
+                    if isinstance(results, dict):
+                        results = [results]
+                    # Generator stages raise while being iterated, so that's covered too
+                    for produced in results or ():
+                        log_kw(stage.produces, **produced)
+                        for downstream in state.downstream:
+                            enqueue(downstream, produced)
+                except Exception as e:
+                    entry = event.get(stage.key) if event is not None else None
+                    log_kw("Stage Error", err=True, stage=stage.name, entry=entry, error=str(e))
+
+                # Source stages run exactly once, whether or not they failed -
+                # nothing ever closes their queue
+                if stage.consumes is None:
+                    break
+        finally:
+            with lock:
+                state.workers_running -= 1
+                finished = state.workers_running == 0
+                ready = []
+                if finished:
+                    for downstream in state.downstream:
+                        downstream.upstream_running -= 1
+                        if downstream.upstream_running == 0:
+                            ready.append(downstream)
+            for downstream in ready:
+                close(downstream)
+
+    # Seed every stage with whatever the logs say is still pending
+    for state in states.values():
+        if state.stage.consumes is None:
+            state.work.put(_SOURCE)
+        else:
+            for event in log_snapshot.get(state.stage.consumes, []):
+                enqueue(state, event)
+
+    threads = []
+    for state in states.values():
+        # A source stage only ever has the one piece of work
+        state.workers = 1 if state.stage.consumes is None else max(1, state.stage.workers)
+        state.workers_running = state.workers
+        for _ in range(state.workers):
+            threads.append(threading.Thread(target=run_worker, args=(state,), name=f"stage-{state.stage.name}", daemon=True))
+
+    for state in states.values():
+        if state.upstream_running == 0 and state.stage.consumes is not None:
+            close(state)
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+# Fields the pipeline logs as numbers. Only these are converted back from
+# logfmt - anything else stays a string however it looks, so an all-digit
+# crc32, hash or path can't turn into a number
+NUMERIC_FIELDS = frozenset((
+    # stat, dedup and chunking
+    "size_bytes", "block_size", "copies", "files", "size_candidates", "partial_candidates",
+    "total_bytes", "fully_read_bytes", "chunks", "min_size", "avg_size", "max_size", "offset", "length",
+    # hash cache
+    "hits", "misses",
+    # StageMetrics
+    "duration_ms", "cpu_ms", "items", "bytes", "items_per_sec", "bytes_per_sec",
+    "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb",
+))
+
+_INT_RE = re.compile(r"-?(?:0|[1-9][0-9]*)")
+_FLOAT_RE = re.compile(r"-?(?:0|[1-9][0-9]*)\.[0-9]+")
+
+def _coerce_value(key, value, numeric_fields=NUMERIC_FIELDS):
+    """Recover the type of a logfmt value in one of numeric_fields - plain ints and decimals become numbers, the rest stay strings"""
+    if not isinstance(value, str) or key not in numeric_fields:
+        return value
+    if _INT_RE.fullmatch(value):
+        return int(value)
+    # nan, inf and 1e3 never match, so everything written is valid JSON
+    if _FLOAT_RE.fullmatch(value):
+        return float(value)
+    return value
+
+def convert_logs(logs_dir="logs", remove=False, numeric_fields=NUMERIC_FIELDS):
+    """Convert every .log file in a logs directory to typed .jsonl.
+
+    Fields in numeric_fields that hold a plain int or decimal get their
+    type back, everything else stays a string. Once a .jsonl sits next to a
+    .log, readers use the .jsonl, so this shouldn't be run on logs that a
+    pipeline is still writing to.
+
+    If the .log was compacted, the manifest is pointed at the matching
+    offset in the .jsonl, so the already-compacted events aren't read a
+    second time with different types.
+
+    Returns:
+        list: (log file, jsonl file) pairs that were converted.
+    """
+    logs_path = Path(logs_dir)
+    manifest = _load_manifest(logs_path)
+    converted = []
+
+    for log_file in sorted(logs_path.glob("*.log")):
+        jsonl_file = log_file.with_suffix(".jsonl")
+        if jsonl_file.exists():
+            continue
+
+        compacted_offset = manifest["sources"].get(log_file.name)
+        jsonl_offset = None
+
+        # Write to a temporary name first so a crash never leaves half a file shadowing the .log
+        tmp_file = jsonl_file.with_suffix(".jsonl.tmp")
+        with open(log_file, 'rb') as src, open(tmp_file, 'wb') as dst:
+            log_offset = 0
+            for raw_line in src:
+                log_offset += len(raw_line)
+                line = raw_line.decode('utf-8', errors='replace').strip(' \t\r\n')
+                if line:
+                    parsed = {key: _coerce_value(key, value, numeric_fields) for key, value in parse_logfmt(line).items()}
+                    dst.write((json.dumps(parsed, ensure_ascii=False, separators=(',', ':')) + "\n").encode('utf-8'))
+                if log_offset == compacted_offset:
+                    jsonl_offset = dst.tell()
+
+        if jsonl_offset is not None:
+            # Before the .jsonl appears - its tail is all that's left to read
+            manifest["sources"][jsonl_file.name] = jsonl_offset
+            _save_manifest(logs_path, manifest)
+        tmp_file.rename(jsonl_file)
+
+        if remove:
+            log_file.unlink()
+        converted.append((log_file, jsonl_file))
+
+    return converted
+
+def _segment_line(msg, event_data):
+    """Canonical JSONL line for an event in a segment - msg first, then fields sorted by key.
+
+    Equal events always produce the same line, and sorting lines groups them by msg.
+    """
+    return json.dumps(
+        {"msg": msg, **dict(sorted(event_data.items()))},
+        ensure_ascii=False,
+        separators=(',', ':'),
+    )
+
+def _write_segment(compacted_path, manifest, lines):
+    """Write sorted lines to the next numbered segment file and return its name"""
+    name = f"segment-{manifest.get('next_segment', 1):06d}.jsonl"
+    manifest["next_segment"] = manifest.get("next_segment", 1) + 1
+
+    tmp_file = compacted_path / (name + ".tmp")
+    with open(tmp_file, 'w') as f:
+        for line in lines:
+            f.write(line + "\n")
+    tmp_file.rename(compacted_path / name)
+    return name
+
+def _merge_segments(compacted_path, segments):
+    """Yield the union of already-sorted segment files in order, without duplicates"""
+    files = [open(compacted_path / segment, 'r') for segment in segments]
+    try:
+        previous = None
+        for line in heapq.merge(*files):
+            line = line.rstrip("\n")
+            if line != previous:
+                yield line
+                previous = line
+    finally:
+        for f in files:
+            f.close()
+
+def compact_logs(logs_dir="logs", max_segments=4, prune=False):
+    """Merge the raw log files into sorted, deduplicated segments, LSM style.
+
+    Lines appended to raw files since the last compaction become one new
+    segment. Once there are more than max_segments segments they are merged
+    into one. The manifest, written last, records the segments and how far
+    into each raw file has been compacted - readers use it to skip
+    straight to the uncompacted tails.
+
+    With prune=True, raw files that are entirely compacted are deleted,
+    along with any .log a .jsonl of the same name was converted from.
+    Don't prune while a pipeline may still be writing to the logs.
+
+    Returns:
+        dict: The new manifest.
+    """
+    logs_path = Path(logs_dir)
+    compacted_path = logs_path / COMPACTED_DIR
+    compacted_path.mkdir(parents=True, exist_ok=True)
+
+    manifest = _load_manifest(logs_path)
+    old_segments = list(manifest["segments"])
+
+    # Only the raw files - existing segments are merged separately below
+    jobs = [(log_file, offset) for log_file, offset in _log_sources(logs_path) if log_file.parent == logs_path]
+
+    lines = set()
+    sources = dict(manifest["sources"])
+    for (log_file, _), (offset, _, events_by_msg) in zip(jobs, _read_log_files(jobs)):
+        for msg, events in events_by_msg.items():
+            lines.update(_segment_line(msg, json.loads(data)) for data in events)
+        sources[log_file.name] = offset
+
+    segments = list(old_segments)
+    if lines:
+        segments.append(_write_segment(compacted_path, manifest, sorted(lines)))
+    merged_away = list(segments)
+
+    if len(segments) > max_segments:
+        segments = [_write_segment(compacted_path, manifest, _merge_segments(compacted_path, segments))]
+
+    if prune:
+        for log_file in _log_files(logs_path):
+            if sources.get(log_file.name) == log_file.stat().st_size:
+                log_file.unlink()
+                # A .log shadowed by a converted (or "both") .jsonl of the same
+                # stem is the same events - left behind, it would be read again
+                if log_file.suffix == ".jsonl":
+                    log_file.with_suffix(".log").unlink(missing_ok=True)
+
+    # Forget raw files that no longer exist
+    existing = {log_file.name for log_file in _log_files(logs_path)}
+    manifest["segments"] = segments
+    manifest["sources"] = {name: offset for name, offset in sources.items() if name in existing}
+    manifest["compacted_at"] = datetime.now().isoformat()
+
+    _save_manifest(logs_path, manifest)
+
+    for segment in merged_away:
+        if segment not in segments:
+            (compacted_path / segment).unlink(missing_ok=True)
+
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintenance commands for a slap logs directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert = commands.add_parser("convert", help="convert .log files to typed .jsonl")
+    convert.add_argument("logs_dir", nargs="?", default="logs", help="logs directory (default: logs)")
+    convert.add_argument("--remove", action="store_true", help="delete each .log once converted")
+
+    compact = commands.add_parser("compact", help="merge log files into sorted, deduplicated segments")
+    compact.add_argument("logs_dir", nargs="?", default="logs", help="logs directory (default: logs)")
+    compact.add_argument(
+        "--max-segments", type=int, default=4,
+        help="merge all segments into one when there are more than this (default: 4)",
+    )
+    compact.add_argument(
+        "--prune", action="store_true",
+        help="delete raw log files once fully compacted - not while a pipeline is writing",
+    )
+
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        manifest = compact_logs(args.logs_dir, max_segments=args.max_segments, prune=args.prune)
+        print(f"{len(manifest['segments'])} segments covering {len(manifest['sources'])} log files")
+    elif args.command == "convert":
+        for log_file, jsonl_file in convert_logs(args.logs_dir, remove=args.remove):
+            print(f"{log_file} -> {jsonl_file}")
+
+
+if __name__ == "__main__":
+    main()
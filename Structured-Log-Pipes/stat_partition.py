@@ -12,23 +12,15 @@
 
 import os
 from pathlib import Path
-from slap import read_logs, setup_logging, log_kw
+from slap import setup_logging, log_kw, iter_pending, StageMetrics
 from datetime import datetime
 
-setup_logging()
 
-log_snapshot = read_logs()
-
-for discovery in log_snapshot.get('File Discovered', []):
+def collect_stat(discovery):
+    """Stat one discovered file and return the File Stat Collected fields, or None if it failed"""
     file_path = discovery['entry']
     root = discovery['root']
 
-    # one way to pro-actively guard against duplicating work
-    if 'File Stat Collected' in log_snapshot:
-        already_collected = any(stat['entry'] == file_path for stat in log_snapshot['File Stat Collected'])
-        if already_collected:
-            continue
-
     try:
         stat_info = os.stat(file_path)
 
@@ -37,8 +29,7 @@ for discovery in log_snapshot.get('File Discovered', []):
         created_time = datetime.fromtimestamp(stat_info.st_ctime).isoformat()
         file_ext = Path(file_path).suffix.lower()
 
-        log_kw(
-            "File Stat Collected",
+        return dict(
             entry=file_path,
             root=root,
             size_bytes=file_size,
@@ -48,3 +39,20 @@ for discovery in log_snapshot.get('File Discovered', []):
         )
     except (OSError, PermissionError) as e:
         log_kw("File Stat Error", err=True, entry=file_path, error=str(e))
+        return None
+
+def main():
+    setup_logging()
+
+    with StageMetrics("stat") as stage:
+        timed_collect_stat = stage.track(collect_stat)
+
+        # skip anything a previous run already finished - when piped, files are
+        # stat'd as they are discovered rather than after the scan is done
+        for discovery in iter_pending('File Discovered', 'File Stat Collected'):
+            if (stat := timed_collect_stat(discovery)) is not None:
+                log_kw("File Stat Collected", **stat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env -S uv run --script
+
+# /// script
+# requires-python = ">=3.14"
+# dependencies = [
+#     "logfmter",
+#     "logfmt",
+#     "rich",
+# ]
+# ///
+
+# Copy every hashed file into a content addressable store, once per hash.
+#
+# Blobs land at ab/cd/<hash> in either a local directory or an S3
+# compatible bucket (MinIO, LocalStack, ...). Each copy is verified against
+# its hash and moved into place atomically, and every stored blob is logged
+# as a "Blob Stored" event - so a run killed halfway picks up where it left off.
+#
+# The S3 backend needs boto3, which isn't a default dependency:
+#
+#   uv run --with boto3 store_items.py --s3-bucket photos --s3-endpoint http://localhost:9000
+
+import argparse
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from hashing import new_hasher, DEFAULT_CHUNK_SIZE
+from slap import query, setup_logging, log_kw
+
+
+# Blobs are keyed by digest alone, so only collision-resistant ones will do -
+# with a 32-bit crc32 or xxh32 key, photo libraries hit real collisions and
+# the second file would never be stored. Their digests differ in length, so
+# the two can't land on each other's keys either.
+STORE_ALGORITHMS = ("blake2b", "sha256")
+
+class BlobMismatchError(Exception):
+    """The file's contents no longer match the hash it was logged with"""
+
+
+def blob_key(file_hash):
+    """Sharded location of a blob - ab/cd/abcd..."""
+    return f"{file_hash[:2]}/{file_hash[2:4]}/{file_hash}"
+
+def copy_verified(file_path, dst, expected_hash, algorithm="blake2b"):
+    """Copy a file into the open binary file dst, hashing it in the same read. Returns the bytes copied.
+
+    Raises BlobMismatchError if what was copied doesn't match expected_hash.
+    """
+    hasher = new_hasher(algorithm)
+    size = 0
+
+    with open(file_path, 'rb') as src:
+        while chunk := src.read(DEFAULT_CHUNK_SIZE):
+            hasher.update(chunk)
+            dst.write(chunk)
+            size += len(chunk)
+
+    if hasher.hexdigest() != expected_hash:
+        raise BlobMismatchError(f"{file_path} changed since it was hashed")
+    return size
+
+class LocalBackend:
+    """Content addressable store in a local directory"""
+
+    name = "local"
+
+    def __init__(self, root):
+        self.root = Path(root).expanduser()
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Logged with each blob, so another store's blobs don't count as stored here
+        self.dest = str(self.root.resolve())
+
+    def exists(self, key):
+        return (self.root / key).exists()
+
+    def put(self, key, file_path, expected_hash, algorithm="blake2b"):
+        """Copy a file in as key, verifying its hash on the way. Returns the bytes written."""
+        dest = self.root / key
+        dest.parent.mkdir(parents=True, exist_ok=True)
+
+        # Copy to a temporary file next to the destination, then rename -
+        # an interrupted copy never leaves a partial blob under a real key
+        fd, tmp_path = tempfile.mkstemp(dir=dest.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, 'wb') as dst:
+                size = copy_verified(file_path, dst, expected_hash, algorithm)
+
+            os.replace(tmp_path, dest)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+        return size
+
+class S3Backend:
+    """Content addressable store in an S3 compatible bucket"""
+
+    name = "s3"
+
+    def __init__(self, bucket, endpoint_url=None, staging_dir=None):
+        # Only needed for this backend - run with `uv run --with boto3`
+        import boto3
+
+        self.bucket = bucket
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+        # The same bucket name on another service is another store
+        self.dest = f"{endpoint_url.rstrip('/')}/{bucket}" if endpoint_url else f"s3://{bucket}"
+        self.staging_dir = staging_dir
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def put(self, key, file_path, expected_hash, algorithm="blake2b"):
+        """Upload a file as key, verifying its hash on the way. Returns the bytes uploaded."""
+        # The file is read once, into a staging copy that's verified before
+        # anything is sent - uploading the file itself could pick up changes
+        # made after the check and store them under the old hash's key. The
+        # copy is unlinked from the start, so a crash leaves nothing behind.
+        with tempfile.TemporaryFile(dir=self.staging_dir) as staged:
+            size = copy_verified(file_path, staged, expected_hash, algorithm)
+            staged.seek(0)
+            # upload_fileobj switches to concurrent multipart uploads for big
+            # files, and S3 only makes the object visible once it completes
+            self.client.upload_fileobj(staged, self.bucket, key)
+        return size
+
+def store_item(backend, hash_event):
+    """Store one blob and log the result"""
+    file_path = hash_event['entry']
+    file_hash = hash_event['hash']
+    algorithm = hash_event.get('algorithm', 'blake2b')
+    key = blob_key(file_hash)
+
+    try:
+        # Already there from a run that died before logging it
+        if backend.exists(key):
+            size = os.path.getsize(file_path)
+        else:
+            size = backend.put(key, file_path, file_hash, algorithm)
+
+        log_kw(
+            "Blob Stored",
+            entry=file_path,
+            hash=file_hash,
+            algorithm=algorithm,
+            key=key,
+            backend=backend.name,
+            dest=backend.dest,
+            size_bytes=size,
+        )
+    except Exception as e:
+        log_kw("Blob Store Error", err=True, entry=file_path, hash=file_hash, error=str(e))
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy hashed files into a content addressable store")
+    parser.add_argument("--dest", default="cas", help="local store directory (default: ./cas)")
+    parser.add_argument("--s3-bucket", help="store in this S3 bucket instead of a local directory")
+    parser.add_argument("--s3-endpoint", help="endpoint URL of an S3 compatible service, e.g. http://localhost:9000")
+    parser.add_argument(
+        "--staging-dir",
+        help="where S3 uploads are staged and verified before sending - needs room for the largest "
+             "files being uploaded at once (default: the system temp directory)",
+    )
+    parser.add_argument(
+        "--algorithm", default="blake2b", choices=STORE_ALGORITHMS,
+        help="which File Hash Collected algorithm to key blobs by (default: blake2b)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=8,
+        help="number of blobs to store at once (default: 8)",
+    )
+    args = parser.parse_args()
+
+    setup_logging()
+
+    if args.s3_bucket:
+        backend = S3Backend(args.s3_bucket, endpoint_url=args.s3_endpoint, staging_dir=args.staging_dir)
+    else:
+        backend = LocalBackend(args.dest)
+
+    log_snapshot = query(['Blob Stored', 'File Hash Collected'], fields=['entry', 'hash', 'algorithm', 'backend', 'dest'])
+
+    # skip anything a previous run already stored in this store, and store each hash once
+    stored = {
+        event['hash'] for event in log_snapshot.get('Blob Stored', [])
+        if 'hash' in event and event.get('backend') == backend.name and event.get('dest') == backend.dest
+    }
+    blobs = {}
+    for hash_event in log_snapshot.get('File Hash Collected', []):
+        file_hash = hash_event.get('hash')
+        if hash_event.get('algorithm', 'blake2b') != args.algorithm:
+            continue
+        if file_hash and file_hash not in stored and file_hash not in blobs:
+            blobs[file_hash] = hash_event
+
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        for hash_event in blobs.values():
+            pool.submit(store_item, backend, hash_event)
+
+
+if __name__ == "__main__":
+    main()